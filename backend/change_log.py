@@ -0,0 +1,81 @@
+from datetime import datetime, timezone
+from collections import deque
+from itertools import islice
+from config import Config
+import threading, uuid
+
+class ChangeLog:
+    """
+    Sequenced log of profile changes made through this plugin (add, update,
+    expire, restore, migrate). Clients sync incrementally by asking for the
+    changes after the last seq they saw; only the newest change of every
+    profile is returned. The epoch changes whenever the sequence restarts, and
+    clients that get reset=true back have to do a full resync.
+
+    Records written to the GDB group by other nodes show up as "sync" changes
+    once the index reconciliation has seen them.
+    """
+
+    def __init__(self, max_entries=Config.CHANGE_LOG_SIZE):
+        self.epoch = uuid.uuid4().hex
+        self.seq = 0
+        self.entries = deque(maxlen=max_entries)
+        self.latest = {}
+        self.lock = threading.Lock()
+
+    def _append(self, entry):
+        if len(self.entries) == self.entries.maxlen:
+            evicted = self.entries[0]
+            if self.latest.get(evicted["public_hash"]) == evicted["seq"]:
+                del self.latest[evicted["public_hash"]]
+        self.entries.append(entry)
+        self.latest[entry["public_hash"]] = entry["seq"]
+
+    def record(self, public_hash, op):
+        with self.lock:
+            self.seq += 1
+            entry = {
+                "seq": self.seq,
+                "op": op,
+                "public_hash": public_hash,
+                "changed_at": datetime.now(timezone.utc).isoformat()
+            }
+            self._append(entry)
+            return entry
+
+    def restore(self, epoch, seq, entries):
+        """Continues a sequence that was persisted before a restart."""
+        with self.lock:
+            self.epoch = epoch
+            self.entries.clear()
+            self.latest = {}
+            for entry in entries:
+                self._append({key: entry[key] for key in ("seq", "op", "public_hash", "changed_at")})
+            self.seq = max(seq, self.entries[-1]["seq"] if self.entries else 0)
+
+    def snapshot(self):
+        """Returns the retained entries as compact [seq, op, public_hash, changed_at] lists."""
+        with self.lock:
+            return [[entry["seq"], entry["op"], entry["public_hash"], entry["changed_at"]] for entry in self.entries]
+
+    @staticmethod
+    def expand(rows):
+        return [dict(zip(("seq", "op", "public_hash", "changed_at"), row)) for row in rows]
+
+    def first_seq(self):
+        return self.entries[0]["seq"] if self.entries else self.seq + 1
+
+    def since(self, seq, limit, epoch=None):
+        """Returns (changes, next_seq, has_more, reset) for the changes after seq."""
+        with self.lock:
+            if (epoch and epoch != self.epoch) or seq > self.seq or seq < self.first_seq() - 1:
+                return [], self.seq, False, True
+            changes = []
+            next_seq = seq
+            for entry in islice(self.entries, seq - self.first_seq() + 1, None):
+                if len(changes) >= limit:
+                    return changes, next_seq, True, False
+                next_seq = entry["seq"]
+                if self.latest.get(entry["public_hash"]) == entry["seq"]:
+                    changes.append(dict(entry))
+            return changes, next_seq, False, False
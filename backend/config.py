@@ -10,6 +10,30 @@ class Config:
     URL = "cpunk_gdb"
     GDB_GROUP_PROD = "cpunk.dna"
     GDB_GROUP_TEST = "local.dna"
+    COLLECTIONS = ("nft_images", "delegations", "messages")
+    COLLECTION_CHUNK_SIZE = 50
+    MESSAGES_PAGE_LIMIT = 50
+    MESSAGES_PAGE_LIMIT_MAX = 500
+    CHANGE_LOG_SIZE = 100000
+    CHANGES_PAGE_LIMIT = 100
+    CHANGES_PAGE_LIMIT_MAX = 1000
+    JOURNAL_DIR = "journal"
+    CHECKPOINT_INTERVAL = 300
+    RECONCILE_INTERVAL = 3600
+    INDEX_SYNC_INTERVAL = 15
+    WORKER_POOLS = {
+        "heavy": {"workers": 2, "queue": 8},
+        "write": {"workers": 1, "queue": 32, "retry_on_timeout": False}
+    }
+    REQUEST_TIMEOUT = 30
+    BULK_MAX_RECORDS = 500
+    BULK_CHUNK_SIZE = 500
+    RESTORE_PROGRESS_FILE = "restore_progress.json"
+    RESTORE_CHECKPOINT_EVERY = 100
+    ENCODING_MIGRATION_BATCH = 200
+    ENCODING_MIGRATION_PAUSE = 0.1
+    STATS_EXPIRING_SOON_DAYS = 30
+    BACKGROUND_START_DELAY = (30, 90)
 
     @staticmethod
     def get_config_file():
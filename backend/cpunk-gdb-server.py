@@ -2,12 +2,27 @@ from handlers import request_handler, gdb_ops
 from pycfhelpers.node.http.simple import CFSimpleHTTPServer, CFSimpleHTTPRequestHandler
 from pycfhelpers.node.logging import CFLog
 from pycfhelpers.node.cli import ReplyObject, CFCliCommand
-import threading, os, json, traceback
+from datetime import datetime, timezone
+import os, json, gzip, traceback, itertools
 from config import Config
 
 log = CFLog()
 
-def restore_dna_data_from_file(index, reply_object: ReplyObject):
+def parse_flags(names, values):
+    """
+    Returns the enabled flags of a command. A value may name any of the flags
+    in any position, or enable the flag of its own position with 1/true/yes.
+    """
+    enabled = set()
+    for name, value in zip(names, values):
+        value = str(value).lower().lstrip("-").replace("-", "_")
+        if value in names:
+            enabled.add(value)
+        elif value in ("1", "true", "yes"):
+            enabled.add(name)
+    return enabled
+
+def restore_dna_data_from_file(index, reply_object: ReplyObject, dry_run=False, delete_extra=False, resume=False):
     if index is None:
         reply_object.reply("Please provide the index of the backup.")
         return
@@ -31,15 +46,83 @@ def restore_dna_data_from_file(index, reply_object: ReplyObject):
             reply_object.reply(f"Invalid index. Available range: 0-{len(backup_files) - 1}")
             return
         backup_file = os.path.join(backup_dir, backup_files[index])
-        with open(backup_file, "r") as f:
+        with (gzip.open(backup_file, "rt") if backup_file.endswith(".gz") else open(backup_file, "r")) as f:
             data = json.load(f)
-        gdb_ops.restore_dna_data(data)
-        reply_object.reply(f"Restored backup from {backup_file}")
+        flags = parse_flags(("dry_run", "delete_extra", "resume"), (dry_run, delete_extra, resume))
+        dry_run = "dry_run" in flags
+        summary, diff = gdb_ops.restore_dna_data(
+            data,
+            source=backup_files[index],
+            dry_run=dry_run,
+            delete_extra="delete_extra" in flags,
+            resume="resume" in flags,
+            progress_file=os.path.join(backup_dir, Config.RESTORE_PROGRESS_FILE)
+        )
+        lines = [f"{'Dry run of restore' if dry_run else 'Restored backup'} from {backup_file}: {summary}"]
+        if dry_run:
+            for status, keys in diff.items():
+                lines.extend(f"{status}: {key}" for key in keys[:20])
+                if len(keys) > 20:
+                    lines.append(f"{status}: ... {len(keys) - 20} more")
+        reply_object.reply("\n".join(lines))
 
     except Exception as e:
         reply_object.reply(f"Failed to restore backup: {e}")
         log.error(traceback.format_exc())
 
+def migrate_dna_data(reply_object: ReplyObject):
+    try:
+        migrated = gdb_ops.migrate_storage()
+        reply_object.reply(f"Migrated {migrated} profiles to split collection storage")
+    except Exception as e:
+        reply_object.reply(f"Failed to migrate data: {e}")
+        log.error(traceback.format_exc())
+
+def read_import_records(f):
+    first = f.read(1)
+    while first and first.isspace():
+        first = f.read(1)
+    if first == "[":
+        yield from json.loads(first + f.read())
+        return
+    for line in itertools.chain([first + f.readline()], f):
+        if line.strip():
+            yield json.loads(line)
+
+def import_dna_data_from_file(file, reply_object: ReplyObject, dry_run=False):
+    if file is None:
+        reply_object.reply("Please provide a JSON or JSON lines file with the records to import.")
+        return
+    try:
+        dry_run = "dry_run" in parse_flags(("dry_run",), (dry_run,))
+        with open(file, "r") as f:
+            results, summary = gdb_ops.bulk_import(read_import_records(f), dry_run=dry_run)
+        results_file = f"{file}.results.json"
+        with open(results_file, "w") as f:
+            json.dump(results, f, indent=2)
+        errors = [f"#{r['index']} {r['name']}: {r['error']}" for r in results if r["status"] == "failed"]
+        reply_object.reply("\n".join([f"{'Validated' if dry_run else 'Imported'} {file}: {summary}", *errors[:20], f"Results written to {results_file}"]))
+    except Exception as e:
+        reply_object.reply(f"Failed to import data: {e}")
+        log.error(traceback.format_exc())
+
+def export_dna_data_to_file(file, reply_object: ReplyObject):
+    try:
+        if file is None:
+            export_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "exports")
+            os.makedirs(export_dir, exist_ok=True)
+            file = os.path.join(export_dir, f"export_{datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')}.json.gz")
+        result = gdb_ops.export_data(os.path.abspath(file))
+        if not result["written"]:
+            reply_object.reply("Nothing to export.")
+            return
+        reply_object.reply(f"Exported {result['profiles']} profiles to {result['file']} ({result['bytes']} bytes)")
+        if result["errors"]:
+            reply_object.reply("Skipped undecodable records:\n" + "\n".join(result["errors"]))
+    except Exception as e:
+        reply_object.reply(f"Failed to export data: {e}")
+        log.error(traceback.format_exc())
+
 def http_server():
     try:
         handler = CFSimpleHTTPRequestHandler(methods=["POST", "GET"], handler=request_handler)
@@ -50,16 +133,37 @@ def http_server():
 
 def init():
     try:
-        t_http = threading.Thread(target=http_server)
-        t_http.start()
+        http_server()
+        gdb_ops.start()
 
         restore_command = CFCliCommand(
             "dna_restore",
             restore_dna_data_from_file,
-            "Restore DNA data"
+            "Restore DNA data from a backup, writing only changed records (dry_run, delete_extra, resume)"
         )
         restore_command.register()
 
+        migrate_command = CFCliCommand(
+            "dna_migrate",
+            migrate_dna_data,
+            "Move DNA messages, delegations and NFT images to their own GDB groups"
+        )
+        migrate_command.register()
+
+        import_command = CFCliCommand(
+            "dna_import",
+            import_dna_data_from_file,
+            "Import DNA registrations from a JSON or JSON lines file"
+        )
+        import_command.register()
+
+        export_command = CFCliCommand(
+            "dna_export",
+            export_dna_data_to_file,
+            "Export all DNA profiles to a JSON file, gzip compressed when it ends in .gz"
+        )
+        export_command.register()
+
         log.notice(f"{Config.PLUGIN_NAME} started!")
         return 0
 
@@ -0,0 +1,138 @@
+"""
+Backup and export worker.
+
+Decoding, serializing and compressing the whole registry holds the GIL for a
+long time, so the plugin only writes a snapshot of the raw GDB values and this
+module turns it into a JSON backup in a separate Python process:
+
+    python3 export_worker.py SNAPSHOT OUTPUT [--last-digest SHA256] [--last-file PATH]
+
+OUTPUT is gzip compressed when it ends in ".gz". The result is printed as one
+JSON line. This module must not import pycfhelpers, it runs outside the node.
+"""
+
+from record_codec import decode_record, record_encoding, available_encodings
+import argparse, gzip, hashlib, json, os, struct, sys
+
+SNAPSHOT_VERSION = 1
+FRAME = struct.Struct(">BII")
+
+def write_snapshot(f, core_items, collections):
+    """
+    Writes a JSON header line followed by one frame per value: group number
+    (0 for the core group, then the collections in header order), key length,
+    value length, key and value.
+    """
+    header = {"version": SNAPSHOT_VERSION, "collections": [name for name, _ in collections]}
+    f.write(json.dumps(header).encode("utf-8") + b"\n")
+    for group, items in enumerate([core_items] + [items for _, items in collections]):
+        for key, value in items:
+            key = key.encode("utf-8")
+            f.write(FRAME.pack(group, len(key), len(value)))
+            f.write(key)
+            f.write(value)
+
+def read_snapshot(f):
+    """Returns (core, collections) with the raw values by key."""
+    header = json.loads(f.readline())
+    if header.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot version {header.get('version')}")
+    groups = [{} for _ in range(len(header["collections"]) + 1)]
+    while True:
+        frame = f.read(FRAME.size)
+        if not frame:
+            break
+        group, key_length, value_length = FRAME.unpack(frame)
+        key = f.read(key_length).decode("utf-8")
+        groups[group][key] = f.read(value_length)
+    return groups[0], dict(zip(header["collections"], groups[1:]))
+
+def _decode(key, value, errors):
+    try:
+        return decode_record(value)
+    except ValueError as e:
+        if record_encoding(value) not in available_encodings():
+            raise RuntimeError(f"Cannot decode {key}: {record_encoding(value)} is not installed for this interpreter")
+        errors.append(f"{key}: {e}")
+        return None
+
+def build_profiles(core, collections):
+    """Assembles the profiles with their collections like GlobalDBOps._get_all_profiles."""
+    errors = []
+    profiles = {}
+    for key, value in core.items():
+        record = _decode(key, value, errors)
+        if record is not None:
+            profiles[key] = record
+    for name, values in collections.items():
+        chunks = {}
+        for key, value in values.items():
+            public_hash, _, chunk = key.partition(".")
+            if not chunk:
+                continue
+            items = _decode(key, value, errors)
+            if items is not None:
+                chunks.setdefault(public_hash, {})[int(chunk)] = items
+        for record in profiles.values():
+            if not isinstance(record.get(name), list):
+                record[name] = []
+        for public_hash, profile_chunks in chunks.items():
+            if public_hash in profiles:
+                profiles[public_hash][name] = [item for chunk in sorted(profile_chunks) for item in profile_chunks[chunk]] + profiles[public_hash][name]
+    return profiles, errors
+
+def _open(path, mode, compressed=None):
+    if compressed is None:
+        compressed = path.endswith(".gz")
+    return gzip.open(path, mode, compresslevel=6) if compressed else open(path, mode)
+
+def file_digest(path):
+    """sha256 of the uncompressed content of a backup file."""
+    digest = hashlib.sha256()
+    with _open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def export(snapshot_file, output, last_digest=None, last_file=None):
+    """
+    Writes the profiles in the snapshot to output unless they serialize to the
+    same content as the last backup. Returns the result summary.
+    """
+    with open(snapshot_file, "rb") as f:
+        core, collections = read_snapshot(f)
+    profiles, errors = build_profiles(core, collections)
+    result = {"written": False, "file": output, "profiles": len(profiles), "errors": errors[:20], "digest": last_digest}
+    if not profiles:
+        return result
+    data = json.dumps(profiles, indent=2).encode("utf-8")
+    result["digest"] = hashlib.sha256(data).hexdigest()
+    if last_digest is None and last_file and os.path.exists(last_file):
+        last_digest = file_digest(last_file)
+    if result["digest"] == last_digest:
+        return result
+    tmp_file = os.path.join(os.path.dirname(output), f".{os.path.basename(output)}.tmp")
+    with _open(tmp_file, "wb", output.endswith(".gz")) as f:
+        f.write(data)
+    os.replace(tmp_file, output)
+    result["written"] = True
+    result["bytes"] = os.path.getsize(output)
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("snapshot")
+    parser.add_argument("output")
+    parser.add_argument("--last-digest")
+    parser.add_argument("--last-file")
+    args = parser.parse_args()
+    try:
+        result = export(args.snapshot, args.output, args.last_digest, args.last_file)
+    except Exception as e:
+        print(f"{type(e).__name__}: {e}", file=sys.stderr)
+        return 1
+    print(json.dumps(result))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+from pycfhelpers.node.logging import CFLog
+from pycfhelpers.node.gdb import CFGDBGroup
+from datetime import datetime, timezone
+from config import Config
+from record_codec import encode_record, decode_record, ENCODING_JSON
+import threading, traceback
+
+class GDBCollections:
+    """
+    Append-only profile collections (messages, delegations, NFT images) kept
+    outside of the main profile record.
+
+    Each collection has its own GDB group named "<profile group>.<collection>".
+    For every profile the group holds a small header under "<public_hash>" and
+    the items in fixed size chunks under "<public_hash>.<chunk>", so appending
+    only rewrites the header and the last chunk instead of the whole profile.
+
+    on_change, when given, is called as on_change(public_hash, name, items)
+    after items were appended and with items set to None after a clear.
+    """
+
+    def __init__(self, base_group, names=Config.COLLECTIONS, chunk_size=Config.COLLECTION_CHUNK_SIZE, encoding=ENCODING_JSON, on_change=None):
+        self.names = tuple(names)
+        self.encoding = encoding
+        self.on_change = on_change
+        self.groups = {name: CFGDBGroup(f"{base_group}.{name}") for name in self.names}
+        self.chunk_size = chunk_size
+        self.lock = threading.RLock()
+        self.log = CFLog()
+
+    @staticmethod
+    def chunk_key(public_hash, chunk):
+        return f"{public_hash}.{chunk:06d}"
+
+    @staticmethod
+    def split_key(key):
+        public_hash, _, chunk = key.partition(".")
+        return public_hash, int(chunk) if chunk else None
+
+    def _read(self, name, key, default=None):
+        value = self.groups[name].get(key)
+        if not value:
+            return default
+        try:
+            return decode_record(value)
+        except ValueError as e:
+            self.log.error(f"Error decoding {name} data for key {key}: {e}")
+            return default
+
+    def _write(self, name, key, value):
+        self.groups[name].set(key, encode_record(value, self.encoding))
+
+    def get_header(self, public_hash, name):
+        return self._read(name, public_hash, {"count": 0})
+
+    def count(self, public_hash, name):
+        return self.get_header(public_hash, name).get("count", 0)
+
+    def get_items(self, public_hash, name, start=0, limit=None):
+        total = self.count(public_hash, name)
+        end = total if limit is None else min(total, start + limit)
+        items = []
+        if start >= end:
+            return items
+        for chunk in range(start // self.chunk_size, (end - 1) // self.chunk_size + 1):
+            chunk_items = self._read(name, self.chunk_key(public_hash, chunk), [])
+            offset = chunk * self.chunk_size
+            lo = max(start - offset, 0)
+            hi = min(end - offset, len(chunk_items))
+            items.extend(chunk_items[lo:hi])
+        return items
+
+    def find_after(self, public_hash, name, field, value):
+        """
+        Returns the index of the first item whose field is greater than value.
+        Items are appended in time order, so chunks are walked from the newest one
+        and the walk stops at the first item at or before value.
+        """
+        total = self.count(public_hash, name)
+        index = total
+        for chunk in range((total - 1) // self.chunk_size, -1, -1):
+            chunk_items = self._read(name, self.chunk_key(public_hash, chunk), [])
+            for offset in range(len(chunk_items) - 1, -1, -1):
+                if str(chunk_items[offset].get(field, "")) <= value:
+                    return index
+                index = chunk * self.chunk_size + offset
+        return index
+
+    def append(self, public_hash, name, new_items):
+        if not new_items:
+            return self.get_header(public_hash, name)
+        with self.lock:
+            header = self.get_header(public_hash, name)
+            count = header.get("count", 0)
+            chunk = count // self.chunk_size
+            chunk_items = self._read(name, self.chunk_key(public_hash, chunk), []) if count % self.chunk_size else []
+            for item in new_items:
+                chunk_items.append(item)
+                count += 1
+                if len(chunk_items) == self.chunk_size:
+                    self._write(name, self.chunk_key(public_hash, chunk), chunk_items)
+                    chunk, chunk_items = chunk + 1, []
+            if chunk_items:
+                self._write(name, self.chunk_key(public_hash, chunk), chunk_items)
+            header["count"] = count
+            header["modified_at"] = datetime.now(timezone.utc).isoformat()
+            self._write(name, public_hash, header)
+            if self.on_change:
+                self.on_change(public_hash, name, new_items)
+            return header
+
+    def clear(self, public_hash, name):
+        with self.lock:
+            header = self.get_header(public_hash, name)
+            count = header.get("count", 0)
+            for chunk in range((count + self.chunk_size - 1) // self.chunk_size):
+                self.groups[name].delete(self.chunk_key(public_hash, chunk))
+            if count or header.get("modified_at"):
+                self._write(name, public_hash, {"count": 0, "modified_at": datetime.now(timezone.utc).isoformat()})
+            if self.on_change:
+                self.on_change(public_hash, name, None)
+
+    def replace(self, public_hash, name, items):
+        with self.lock:
+            self.clear(public_hash, name)
+            self.append(public_hash, name, items)
+
+    def get_all(self, public_hash):
+        return {name: self.get_items(public_hash, name) for name in self.names}
+
+    def iter_profiles(self, name):
+        """Yields (public_hash, items) for every profile with a non-empty collection."""
+        chunks = {}
+        for key, value in self.groups[name].items():
+            try:
+                public_hash, chunk = self.split_key(key)
+                if chunk is None:
+                    continue
+                chunks.setdefault(public_hash, {})[chunk] = decode_record(value)
+            except ValueError as e:
+                self.log.error(f"Error decoding {name} data for key {key}: {e}")
+                self.log.error(traceback.format_exc())
+        for public_hash, profile_chunks in chunks.items():
+            items = []
+            for chunk in sorted(profile_chunks):
+                items.extend(profile_chunks[chunk])
+            if items:
+                yield public_hash, items
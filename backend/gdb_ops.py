@@ -1,21 +1,85 @@
 from datetime import datetime, timedelta, timezone
-from response_helpers import send_json_response
+from response_helpers import send_json_response, send_not_modified
 from utils import Utils as u
 from config import Config
 from pycfhelpers.node.logging import CFLog
 from pycfhelpers.node.gdb import CFGDBGroup
 from pycfhelpers.node.crypto import CFGUUID
-from time import sleep
-import json, threading, traceback, copy, os
+from gdb_collections import GDBCollections
+from change_log import ChangeLog
+from registry_index import RegistryIndex
+from registry_stats import RegistryStats
+from journal import MutationJournal
+from record_codec import encode_record, decode_record, record_encoding, available_encodings, ENCODING_JSON, ENCODING_MSGPACK
+from time import sleep, time
+import export_worker
+from email.utils import format_datetime
+import json, threading, traceback, copy, os, hashlib, random, subprocess
 
 thread_lock = threading.Lock()
 
 class GlobalDBOps:
+    """
+    Nothing is read from the GDB or disk on construction. start() loads the
+    change log checkpoint and warms up the index in the background, and
+    starts the maintenance loops after a random delay. Until the index is
+    ready, lookups are answered by scanning the group.
+
+    Records replicated from other nodes never pass through this plugin. The
+    sync loop picks them up every INDEX_SYNC_INTERVAL seconds, until then a
+    lookup for them is answered from the index as not found.
+    """
+
     def __init__(self):
-        self.gdb_group = CFGDBGroup(Config.GDB_GROUP_TEST if Config.TEST_MODE else Config.GDB_GROUP_PROD)
+        group = Config.GDB_GROUP_TEST if Config.TEST_MODE else Config.GDB_GROUP_PROD
         self.log = CFLog()
-        threading.Thread(target=self.remove_expired_gdb_entries, daemon=True).start()
-        threading.Thread(target=self.backup_dna_data, daemon=True).start()
+        config = Config.load_config()
+        self.encoding = config.get("RECORD_ENCODING", ENCODING_JSON)
+        if self.encoding not in available_encodings():
+            self.log.error(f"Record encoding {self.encoding} is not available, using {ENCODING_JSON}")
+            self.encoding = ENCODING_JSON
+        self.gdb_group = CFGDBGroup(group)
+        self.stats = RegistryStats()
+        self.collections = GDBCollections(group, encoding=self.encoding, on_change=self.stats.collection_changed)
+        self.changes = ChangeLog()
+        self.net_ids = [int(net["id"], 16) for net in config.get("NET_IDS", [])]
+        self.index = RegistryIndex(self._derived_wallets, self.net_ids, self.stats)
+        self.journal = MutationJournal(os.path.join(u.get_current_script_directory(), Config.JOURNAL_DIR))
+        self.mutation_lock = threading.Lock()
+        self.record_lock = threading.Lock()
+        self.sync_lock = threading.Lock()
+        self.synced_at = 0
+        self.changes_loaded = threading.Event()
+        self.checkpoint = None
+        self.stage = "created"
+        self.started_at = time()
+        self.ready_at = None
+        self.index_source = None
+
+    def start(self):
+        if self.stage != "created":
+            return
+        self.stage = "starting"
+        self.started_at = time()
+        threading.Thread(target=self.warm_up_index, daemon=True).start()
+        for loop in (self.checkpoint_index, self.sync_index_loop, self.remove_expired_gdb_entries, self.backup_dna_data):
+            threading.Thread(target=self._start_delayed, args=(loop,), daemon=True).start()
+
+    def _start_delayed(self, loop):
+        sleep(random.uniform(*Config.BACKGROUND_START_DELAY))
+        loop()
+
+    def _load_change_log(self):
+        """Continues the change log from the last checkpoint, before any new change is recorded."""
+        try:
+            self.checkpoint = self.journal.load()
+            if self.checkpoint:
+                entries = ChangeLog.expand(self.checkpoint["changes"]) + self.checkpoint["tail"]
+                self.changes.restore(self.checkpoint["epoch"], self.checkpoint["seq"], entries)
+            else:
+                self.journal.reset()
+        finally:
+            self.changes_loaded.set()
 
     def _get_public_hash(self, data):
         wallet = u.wallet_addr_to_dict(data.get("wallet"))
@@ -36,12 +100,248 @@ class GlobalDBOps:
         result_dict = {}
         for key, value in self.gdb_group.items():
             try:
-                result_dict[key] = json.loads(value.decode("utf-8"))
-            except (UnicodeDecodeError, json.JSONDecodeError) as e:
+                result_dict[key] = decode_record(value)
+            except ValueError as e:
                 self.log.error(f"Error decoding data for key {key}: {e}")
                 self.log.error(traceback.format_exc())
         return result_dict
 
+    def _reindex(self, public_hash):
+        value = self.gdb_group.get(public_hash)
+        record = decode_record(value) if value else None
+        self.index.update(public_hash, record, RegistryIndex.digest(value) if value else None)
+        return value
+
+    def _try_reindex(self, public_hash):
+        """Re-indexes a record during warm-up, skipping it when it cannot be indexed."""
+        try:
+            self._reindex(public_hash)
+        except Exception as e:
+            self.log.error(f"Failed to index {public_hash}, skipping it: {e}")
+            self.log.error(traceback.format_exc())
+
+    def _record_change(self, public_hash, op):
+        """Journals a mutation and brings the index and the change log up to date."""
+        self.changes_loaded.wait()
+        with self.mutation_lock:
+            value = self._reindex(public_hash)
+            change = self.changes.record(public_hash, op)
+            self.journal.append(change, RegistryIndex.digest(value) if value else None)
+
+    def _derived_wallets(self, public_hash, record):
+        sign_id = record.get("sign_id")
+        if not isinstance(sign_id, int):
+            return []
+        try:
+            return [u.build_cf_address(1, net_id, sign_id, bytes.fromhex(public_hash)) for net_id in self.net_ids]
+        except (ValueError, OverflowError):
+            return []
+
+    def _indexed_record(self, mapping, key, matches):
+        """
+        Returns (public_hash, record) using the index, (None, None) when the
+        index has no match, or None while the index is not ready and the caller
+        has to scan. A stale entry is re-indexed and the key looked up once
+        more, so a ready index never leads to a scan.
+        """
+        if not self.index.ready.is_set():
+            return None
+        stale = None
+        for _ in range(2):
+            public_hash = mapping.get(key)
+            if not public_hash or public_hash == stale:
+                break
+            record = self._get_record(public_hash)
+            if record and matches(public_hash, record):
+                return public_hash, record
+            self._reindex(public_hash)
+            stale = public_hash
+        return None, None
+
+    def _find_by(self, fields, key):
+        """
+        Resolves a GUUID or wallet address to (public_hash, record), or
+        (None, None) when no profile has it. Scans all profiles while the
+        index is not ready.
+        """
+        key = key.strip().lower()
+
+        def matches(public_hash, record):
+            entry = self.index.describe(public_hash, record)
+            return any(key == entry[field] if isinstance(entry[field], str) else key in entry[field] for field in fields)
+
+        for field in fields:
+            found = self._indexed_record(self.index.mapping(field), key, matches)
+            if found is None:
+                break
+            if found[0]:
+                return found
+        else:
+            return None, None
+        for public_hash, record in self._get_all_gdb_data().items():
+            if matches(public_hash, record):
+                return public_hash, record
+        return None, None
+
+    @staticmethod
+    def _has_name(record, name):
+        return name.lower() in (n.lower() for n in record.get("registered_names", {}))
+
+    def _get_record(self, public_hash):
+        value = self.gdb_group.get(public_hash)
+        if not value:
+            return None
+        return decode_record(value)
+
+    def _save_record(self, public_hash, record):
+        with self.record_lock:
+            self.gdb_group.set(public_hash, encode_record(record, self.encoding))
+
+    @staticmethod
+    def _embedded(record, name):
+        """Items of a collection still embedded in the record, by this or an older node."""
+        items = record.get(name)
+        return items if isinstance(items, list) else []
+
+    def _assemble_record(self, public_hash, record, exclude=()):
+        """
+        Builds the full profile, loading collections that are stored in their own
+        groups. Items still embedded in the record follow the stored ones.
+        """
+        profile = dict(record)
+        for name in self.collections.names:
+            if name in exclude:
+                profile.pop(name, None)
+            else:
+                profile[name] = self.collections.get_items(public_hash, name) + self._embedded(record, name)
+        return profile
+
+    def _excluded_collections(self, exclude, fields):
+        if fields is None:
+            return tuple(exclude)
+        return tuple(exclude) + tuple(name for name in self.collections.names if name not in fields)
+
+    def _profile_version(self, public_hash, record, exclude=(), fields=None):
+        """
+        Returns (etag, last_modified) for a profile response. The ETag covers the core
+        record, the headers of every included collection and the requested projection.
+        """
+        exclude = self._excluded_collections(exclude, fields)
+        digest = hashlib.sha256(json.dumps(record, sort_keys=True).encode("utf-8"))
+        timestamps = [record.get("modified_at", "")]
+        timestamps.extend(entry.get("created_at", "") for entry in record.get("registered_names", {}).values())
+        for name in self.collections.names:
+            if name not in exclude:
+                header = self.collections.get_header(public_hash, name)
+                digest.update(f"{name}:{header.get('count', 0)}:{header.get('modified_at', '')}".encode("utf-8"))
+                timestamps.append(header.get("modified_at", ""))
+        digest.update(f"{sorted(exclude)}:{fields}".encode("utf-8"))
+        etag = f'"{digest.hexdigest()[:32]}"'
+        last_modified = None
+        try:
+            newest = max(timestamp for timestamp in timestamps if timestamp)
+            last_modified = format_datetime(datetime.fromisoformat(newest).astimezone(timezone.utc), usegmt=True)
+        except ValueError:
+            pass
+        return etag, last_modified
+
+    def _project_profile(self, public_hash, record, exclude=(), fields=None):
+        """
+        Builds the public view of a profile. With fields set only those top level fields
+        are returned, so collections and wallet_addresses are only built when asked for.
+        """
+        profile = self._assemble_record(public_hash, record, self._excluded_collections(exclude, fields))
+        if fields is None or "wallet_addresses" in fields:
+            profile["wallet_addresses"] = u.generate_wallet_addresses(profile["sign_id"], public_hash)
+        profile.pop("guuid", None)
+        if fields is not None:
+            profile = {key: value for key, value in profile.items() if key in fields}
+        return profile
+
+    def _profile_response(self, public_hash, record, exclude=(), fields=None, if_none_match=None):
+        etag, last_modified = self._profile_version(public_hash, record, exclude, fields)
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if last_modified:
+            headers["Last-Modified"] = last_modified
+        if if_none_match:
+            tags = [tag.strip()[2:] if tag.strip().startswith("W/") else tag.strip() for tag in if_none_match.split(",")]
+            if etag in tags or "*" in tags:
+                return send_not_modified(headers)
+        return send_json_response(status_code=0, response_data=self._project_profile(public_hash, record, exclude, fields), headers=headers)
+
+    def _iter_collection(self, name, all_data):
+        """Yields (public_hash, items) with the stored items followed by the embedded ones."""
+        stored = dict(self.collections.iter_profiles(name))
+        for public_hash, record in all_data.items():
+            items = stored.get(public_hash, []) + self._embedded(record, name)
+            if items:
+                yield public_hash, items
+
+    def _update_collection(self, public_hash, name, items, clear_on_empty=True, timestamp_field=None):
+        if not items:
+            if clear_on_empty and self.collections.count(public_hash, name):
+                self.collections.clear(public_hash, name)
+                return True
+            return False
+        if timestamp_field:
+            for item in items:
+                item.setdefault(timestamp_field, datetime.now(timezone.utc).isoformat())
+        self.collections.append(public_hash, name, items)
+        return True
+
+    def _write_profile(self, public_hash, profile):
+        """
+        Stores a profile, appending the collections embedded in it to their own
+        groups. Older nodes keep appending to the embedded lists, so those items
+        are newer than the stored ones and must not replace them.
+        """
+        record = dict(profile)
+        for name in self.collections.names:
+            if name in record:
+                self.collections.append(public_hash, name, self._embedded(record, name))
+                del record[name]
+        self._save_record(public_hash, record)
+        return record
+
+    def migrate_record(self, public_hash, record):
+        """Moves collections embedded in a profile record into their own groups."""
+        if not any(name in record for name in self.collections.names):
+            return record
+        with thread_lock:
+            record = self._write_profile(public_hash, record)
+        self._record_change(public_hash, "migrate")
+        self.log.notice(f"Migrated {public_hash} to split collection storage")
+        return record
+
+    def migrate_storage(self):
+        migrated = 0
+        for public_hash, record in self._get_all_gdb_data().items():
+            if any(name in record for name in self.collections.names):
+                self.migrate_record(public_hash, record)
+                migrated += 1
+        return migrated
+
+    def _find_profile(self, lookup):
+        if u.validate_address(lookup):
+            public_hash, _ = self._get_public_hash({"wallet": lookup})
+            record = self._get_record(public_hash) if public_hash else None
+            return (public_hash, record) if record else (None, None)
+        found = self._indexed_record(self.index.names, lookup.lower(), lambda _, record: self._has_name(record, lookup))
+        if found is not None:
+            return found
+        for public_hash, record in self._get_all_gdb_data().items():
+            if lookup.lower() in record.get("registered_names", {}):
+                return public_hash, record
+        return None, None
+
+    def _get_all_profiles(self):
+        all_data = self._get_all_gdb_data()
+        for name in self.collections.names:
+            stored = dict(self.collections.iter_profiles(name))
+            for public_hash, record in all_data.items():
+                record[name] = stored.get(public_hash, []) + self._embedded(record, name)
+        return all_data
+
     def write_gdb_data(self, data):
         try:
             self.log.notice(f"Received data: {data}")
@@ -59,7 +359,7 @@ class GlobalDBOps:
 
             if existing_entry:
                 self.log.notice(existing_entry)
-                existing_entry_json = json.loads(existing_entry.decode("utf-8"))
+                existing_entry_json = decode_record(existing_entry)
                 if name in existing_entry_json.get("registered_names", {}):
                     return send_json_response("NOK", f"You have already registered {name}, use update method!", -1)
                 self.log.notice("Data already exists in GlobalDB, updating...")
@@ -68,61 +368,90 @@ class GlobalDBOps:
                 self.log.error(f"Name '{name}' is already taken.")
                 return send_json_response("NOK", f"Name '{name}' is already taken!", -1)
 
-            data_to_write = {
-                    "public_hash": public_hash,
-                    "guuid": str(CFGUUID.generate()).lower(),
-                    "sign_id": sign_id,
-                    "registered_names": {
-                        name: {
-                            "created_at": datetime.now(timezone.utc).isoformat(),
-                            "expires_on": (datetime.now(timezone.utc) + timedelta(days=365)).isoformat(),
-                            "tx_hash": tx_hash
-                        }
-                    },
-                    "socials": {
-                        "telegram": {
-                            "profile": ""
-                        },
-                        "x": {
-                            "profile": ""
-                        },
-                        "facebook": {
-                            "profile": ""
-                        },
-                        "instagram": {
-                            "profile": ""
-                        }
-                    },
-                    "bio": "",
-                    "dinosaur_wallets": {"BTC": "", "ETH": "", "SOL": "", "QEVM": "" },
-                    "nft_images": [],
-                    "profile_picture": "",
-                    "delegations": [],
-                    "messages": []
-                }
-            self.gdb_group.set(
-                public_hash,
-                json.dumps(data_to_write).encode("utf-8")
-            )
+            data_to_write = self._new_profile(public_hash, sign_id, name, tx_hash)
+            self._save_record(public_hash, data_to_write)
+            self._record_change(public_hash, "add")
             self.log.notice(f"Wrote {public_hash} to GlobalDB")
-            return send_json_response("OK", "Data was written to GlobalDB!", 0, response_data=data_to_write)
+            return send_json_response("OK", "Data was written to GlobalDB!", 0, response_data=self._assemble_record(public_hash, data_to_write))
         except Exception as e:
             self.log.error(f"Error: {e}")
             self.log.error(traceback.format_exc())
             return send_json_response("NOK", "Failed to write data to GlobalDB", -1)
 
+    def _new_profile(self, public_hash, sign_id, name, tx_hash):
+        return {
+            "public_hash": public_hash,
+            "guuid": str(CFGUUID.generate()).lower(),
+            "sign_id": sign_id,
+            "registered_names": {
+                name: {
+                    "created_at": datetime.now(timezone.utc).isoformat(),
+                    "expires_on": (datetime.now(timezone.utc) + timedelta(days=365)).isoformat(),
+                    "tx_hash": tx_hash
+                }
+            },
+            "socials": {
+                "telegram": {
+                    "profile": ""
+                },
+                "x": {
+                    "profile": ""
+                },
+                "facebook": {
+                    "profile": ""
+                },
+                "instagram": {
+                    "profile": ""
+                }
+            },
+            "bio": "",
+            "dinosaur_wallets": {"BTC": "", "ETH": "", "SOL": "", "QEVM": "" },
+            "profile_picture": ""
+        }
+
+    def _apply_profile_fields(self, existing_data, data):
+        if "socials" in data:
+            existing_data.setdefault("socials", {})
+            for platform, details in data["socials"].items():
+                existing_data["socials"].setdefault(platform, {"profile": ""})
+                if "profile" in details:
+                    existing_data["socials"][platform]["profile"] = details["profile"]
+
+        if "bio" in data:
+            existing_data["bio"] = data["bio"]
+
+        if "profile_picture" in data:
+            existing_data["profile_picture"] = data["profile_picture"]
+
+        if "dinosaur_wallets" in data:
+            existing_data.setdefault("dinosaur_wallets", {})
+            for network, address in data["dinosaur_wallets"].items():
+                existing_data["dinosaur_wallets"][network] = address
+
+    def _apply_collections(self, public_hash, data):
+        collections_changed = False
+        if "nft_images" in data:
+            collections_changed |= self._update_collection(public_hash, "nft_images", data["nft_images"], clear_on_empty=False)
+
+        if "delegations" in data:
+            collections_changed |= self._update_collection(public_hash, "delegations", data["delegations"], timestamp_field="delegation_time")
+
+        if "messages" in data:
+            collections_changed |= self._update_collection(public_hash, "messages", data["messages"], timestamp_field="timestamp")
+        return collections_changed
+
     def update_gdb_data_old_name(self, data):
         try:
             public_hash, _ = self._get_public_hash(data)
             if not public_hash:
                 return send_json_response("NOK", "Failed to parse wallet address!", -1)
 
-            existing_data = self.gdb_group.get(public_hash)
+            existing_data = self._get_record(public_hash)
             if not existing_data:
                 self.log.error(f"No existing data found for {public_hash}")
                 return send_json_response("NOK", f"No existing data found for {public_hash}", -1)
 
-            existing_data = json.loads(existing_data.decode("utf-8"))
+            existing_data = self.migrate_record(public_hash, existing_data)
             original_data = copy.deepcopy(existing_data)
 
             if data.get("guuid"):
@@ -151,106 +480,294 @@ class GlobalDBOps:
                         "tx_hash": data.get("tx_hash", "")
                     }
 
-            if "socials" in data:
-                existing_data.setdefault("socials", {})
-                for platform, details in data["socials"].items():
-                    existing_data["socials"].setdefault(platform, {"profile": ""})
-                    if "profile" in details:
-                        existing_data["socials"][platform]["profile"] = details["profile"]
-
-            if "nft_images" in data:
-                existing_data.setdefault("nft_images", [])
-                existing_data["nft_images"].extend(data["nft_images"])
-
-            if "bio" in data:
-                existing_data["bio"] = data["bio"]
-
-            if "profile_picture" in data:
-                existing_data["profile_picture"] = data["profile_picture"]
-
-            if "dinosaur_wallets" in data:
-                existing_data.setdefault("dinosaur_wallets", {})
-                for network, address in data["dinosaur_wallets"].items():
-                    existing_data["dinosaur_wallets"][network] = address
-
-            if "delegations" in data:
-                existing_data.setdefault("delegations", [])
-                if not data["delegations"]:
-                    existing_data["delegations"] = []
-                else:
-                    for delegation in data["delegations"]:
-                        delegation.setdefault("delegation_time", datetime.now(timezone.utc).isoformat())
-                        existing_data["delegations"].append(delegation)
-
-            if "messages" in data:
-                existing_data.setdefault("messages", [])
-                if not data["messages"]:
-                    existing_data["messages"] = []
-                else:
-                    for message in data["messages"]:
-                        message.setdefault("timestamp", datetime.now(timezone.utc).isoformat())
-                        existing_data["messages"].append(message)
+            self._apply_profile_fields(existing_data, data)
+            collections_changed = self._apply_collections(public_hash, data)
 
             if existing_data != original_data:
                 existing_data["modified_at"] = datetime.now(timezone.utc).isoformat()
-                self.gdb_group.set(public_hash, json.dumps(existing_data).encode("utf-8"))
-                self.log.notice(f"Updated {public_hash} in GlobalDB")
+                self._save_record(public_hash, existing_data)
 
+            if existing_data != original_data or collections_changed:
+                self._record_change(public_hash, "update")
+                self.log.notice(f"Updated {public_hash} in GlobalDB")
+                existing_data = self._assemble_record(public_hash, existing_data)
                 existing_data["public_hash"] = public_hash
                 return send_json_response("OK", f"Updated {public_hash} in GlobalDB", 0, response_data=existing_data)
             else:
-                return send_json_response("OK", "No changes detected, data was not updated.", 0, response_data=existing_data)
+                return send_json_response("OK", "No changes detected, data was not updated.", 0, response_data=self._assemble_record(public_hash, existing_data))
 
         except Exception as e:
             self.log.error(f"Failed to update GlobalDB: {e}")
             self.log.error(traceback.format_exc())
             return send_json_response("NOK", "Failed to update GlobalDB", -1)
 
-    def gdb_lookup(self, lookup, by_telegram_name=False, by_order_hash=False, as_list=False):
+    def _name_owners(self):
+        """Name to public_hash for every name in the core group, read from the store."""
+        owners = {}
+        for public_hash, record in self._get_all_gdb_data().items():
+            for name in record.get("registered_names", {}):
+                owners[name.lower()] = public_hash
+        return owners
+
+    def _write_bulk_record(self, public_hash, sign_id, name, data):
+        record = self._get_record(public_hash)
+        if record:
+            record = self.migrate_record(public_hash, record)
+            record.setdefault("registered_names", {})[name] = {
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "expires_on": (datetime.now(timezone.utc) + timedelta(days=365)).isoformat(),
+                "tx_hash": data.get("tx_hash", "")
+            }
+            record["modified_at"] = datetime.now(timezone.utc).isoformat()
+            op = "update"
+        else:
+            record = self._new_profile(public_hash, sign_id, name, data.get("tx_hash"))
+            op = "add"
+        self._apply_profile_fields(record, data)
+        self._save_record(public_hash, record)
+        self._apply_collections(public_hash, data)
+        self._record_change(public_hash, op)
+        return "added" if op == "add" else "updated"
+
+    @staticmethod
+    def _name_conflict(name, owner, public_hash):
+        if owner == public_hash:
+            return f"Name '{name}' is already registered to this wallet!"
+        return f"Name '{name}' is already taken!" if owner else None
+
+    def _check_bulk_record(self, data, disallowed_names, owners):
+        """Returns (public_hash, sign_id, error) for one record of a bulk import."""
+        if not isinstance(data, dict):
+            return None, None, "Record must be an object!"
+        error = u.validate_add_data(data, disallowed_names)
+        if error:
+            return None, None, error
+        public_hash, sign_id = self._get_public_hash(data)
+        if not public_hash:
+            return None, None, "Failed to parse wallet address!"
+        name = data["name"].lower()
+        return public_hash, sign_id, self._name_conflict(name, owners.get(name), public_hash)
+
+    def bulk_import(self, records, dry_run=False):
+        """
+        Registers a stream of records. Names are checked against a scan of the
+        store and against the earlier records of the batch, and writes are
+        applied in chunks of BULK_CHUNK_SIZE. Each chunk is checked against a
+        fresh scan again before it is written, so names registered in the
+        meantime are not overwritten. Returns per-record results and a summary.
+        """
+        disallowed_names = Config.load_config().get("DISALLOWED_NAMES", [])
+        owners = self._name_owners()
+        results = []
+        summary = {"total": 0, "added": 0, "updated": 0, "valid": 0, "failed": 0}
+        pending = []
+
+        def flush():
+            current = self._name_owners() if pending and not dry_run else {}
+            for result, public_hash, sign_id, data in pending:
+                error = self._name_conflict(result["name"], current.get(result["name"]), public_hash)
+                if error:
+                    result.update(status="failed", error=error)
+                    summary["failed"] += 1
+                    continue
+                try:
+                    result["status"] = "valid" if dry_run else self._write_bulk_record(public_hash, sign_id, result["name"], data)
+                except Exception as e:
+                    self.log.error(f"Failed to import {result['name']}: {e}")
+                    self.log.error(traceback.format_exc())
+                    result.update(status="failed", error="Failed to write data to GlobalDB")
+                summary[result["status"]] += 1
+            pending.clear()
+            self.log.notice(f"Bulk import progress: {summary}")
+
+        for position, data in enumerate(records):
+            summary["total"] += 1
+            result = {"index": position, "name": str(data.get("name", "") if isinstance(data, dict) else "").lower()}
+            results.append(result)
+            try:
+                public_hash, sign_id, error = self._check_bulk_record(data, disallowed_names, owners)
+            except Exception as e:
+                self.log.error(f"Failed to validate bulk record #{position}: {e}")
+                self.log.error(traceback.format_exc())
+                public_hash, sign_id, error = None, None, "Invalid record!"
+            if error:
+                result.update(status="failed", error=error)
+                summary["failed"] += 1
+                continue
+            owners[result["name"]] = public_hash
+            result["public_hash"] = public_hash
+            pending.append((result, public_hash, sign_id, data))
+            if len(pending) >= Config.BULK_CHUNK_SIZE:
+                flush()
+        flush()
+        return results, summary
+
+    def write_bulk_data(self, data):
+        try:
+            results, summary = self.bulk_import(data["records"], dry_run=bool(data.get("dry_run")))
+            return send_json_response("OK", f"Imported {summary['added'] + summary['updated']} of {summary['total']} records", 0, response_data={
+                "summary": summary,
+                "results": results
+            })
+        except Exception as e:
+            self.log.error(f"Bulk import failed: {e}")
+            self.log.error(traceback.format_exc())
+            return send_json_response("NOK", "Bulk import failed", -1)
+
+    def append_messages(self, data):
+        try:
+            lookup = data.get("name") or data.get("wallet")
+            public_hash, record = self._find_profile(lookup)
+            if not public_hash:
+                return send_json_response("NOK", f"DNA '{lookup}' not found", -1)
+            self.migrate_record(public_hash, record)
+            self._update_collection(public_hash, "messages", data["messages"], clear_on_empty=False, timestamp_field="timestamp")
+            self._record_change(public_hash, "update")
+            total = self.collections.count(public_hash, "messages")
+            self.log.notice(f"Added {len(data['messages'])} messages to {public_hash}")
+            return send_json_response("OK", f"Added {len(data['messages'])} messages", 0, response_data={"public_hash": public_hash, "total": total})
+        except Exception as e:
+            self.log.error(f"Failed to add messages: {e}")
+            self.log.error(traceback.format_exc())
+            return send_json_response("NOK", "Failed to add messages", -1)
+
+    def get_messages(self, lookup, cursor=None, since=None, limit=None):
+        try:
+            public_hash, record = self._find_profile(lookup)
+            if not public_hash:
+                return send_json_response("NOK", f"DNA '{lookup}' not found", -1)
+            limit = min(int(limit or Config.MESSAGES_PAGE_LIMIT), Config.MESSAGES_PAGE_LIMIT_MAX)
+            embedded = self._embedded(record, "messages")
+            legacy_messages = self.collections.get_items(public_hash, "messages") + embedded if embedded else None
+            if legacy_messages is not None:
+                total = len(legacy_messages)
+            else:
+                total = self.collections.count(public_hash, "messages")
+
+            if cursor is not None:
+                start = max(int(cursor), 0)
+            elif since:
+                if legacy_messages is not None:
+                    start = next((i for i, m in enumerate(legacy_messages) if str(m.get("timestamp", "")) > since), total)
+                else:
+                    start = self.collections.find_after(public_hash, "messages", "timestamp", since)
+            else:
+                start = max(total - limit, 0)
+
+            if legacy_messages is not None:
+                messages = legacy_messages[start:start + limit]
+            else:
+                messages = self.collections.get_items(public_hash, "messages", start, limit)
+            return send_json_response(status_code=0, response_data={
+                "public_hash": public_hash,
+                "messages": messages,
+                "cursor": start,
+                "next_cursor": start + len(messages),
+                "total": total
+            })
+        except ValueError:
+            return send_json_response("NOK", "Invalid cursor or limit!", -1)
+        except Exception as e:
+            self.log.error(f"Error fetching messages for {lookup}: {e}")
+            self.log.error(traceback.format_exc())
+            return send_json_response("NOK", f"Error fetching messages for {lookup}", -1)
+
+    def get_changes(self, since, limit=None, epoch=None, exclude=(), fields=None):
+        if not self.changes_loaded.is_set():
+            return send_json_response("NOK", "Change log is loading, try again later!", -1, http_code=503, headers={"Retry-After": "1"})
+        try:
+            limit = min(int(limit or Config.CHANGES_PAGE_LIMIT), Config.CHANGES_PAGE_LIMIT_MAX)
+            changes, next_seq, has_more, reset = self.changes.since(int(since), limit, epoch)
+            for change in changes:
+                record = self._get_record(change["public_hash"])
+                change["record"] = self._project_profile(change["public_hash"], record, exclude, fields) if record else None
+            return send_json_response(status_code=0, response_data={
+                "epoch": self.changes.epoch,
+                "last_seq": self.changes.seq,
+                "next_seq": next_seq,
+                "has_more": has_more,
+                "reset": reset,
+                "changes": changes
+            })
+        except ValueError:
+            return send_json_response("NOK", "Invalid sequence number or limit!", -1)
+        except Exception as e:
+            self.log.error(f"Error fetching changes since {since}: {e}")
+            self.log.error(traceback.format_exc())
+            return send_json_response("NOK", f"Error fetching changes since {since}", -1)
+
+    def gdb_lookup(self, lookup, by_telegram_name=False, by_order_hash=False, as_list=False, exclude=(), fields=None, if_none_match=None, by_guuid=False, by_wallet=False):
         try:
-            all_data = self._get_all_gdb_data()
             if lookup == "all_delegations":
+                all_data = self._get_all_gdb_data()
                 all_delegations = []
-                for public_hash, parsed_data in all_data.items():
-                    delegations = parsed_data.get("delegations", [])
-                    if not delegations:
-                        continue
+                for public_hash, delegations in self._iter_collection("delegations", all_data):
+                    parsed_data = all_data[public_hash]
                     for delegation in delegations:
                         enriched = delegation.copy()
                         enriched["public_hash"] = public_hash
                         enriched["sign_id"] = parsed_data.get("sign_id")
                         enriched["registered_names"] = parsed_data.get("registered_names", [])
-                        if "guuid" in parsed_data:
-                            del parsed_data["guuid"]
                         all_delegations.append(enriched)
                 return send_json_response(status_code=0, response_data=all_delegations)
 
             if by_telegram_name:
-                for public_hash, parsed_data in all_data.items():
-                    telegram_profile = parsed_data.get("socials", {}).get("telegram", {}).get("profile", "").lower()
+                found = self._indexed_record(
+                    self.index.telegram, lookup.lower(),
+                    lambda _, record: RegistryIndex.summarize(record)["telegram"] == lookup.lower()
+                )
+                if found is not None:
+                    if found[0]:
+                        return self._profile_response(*found, exclude, fields, if_none_match)
+                    return send_json_response("NOK", f"Telegram username {lookup} not found", -1)
+                for public_hash, parsed_data in self._get_all_gdb_data().items():
+                    telegram_profile = RegistryIndex.summarize(parsed_data)["telegram"]
                     if telegram_profile and telegram_profile == lookup.lower():
-                        parsed_data["wallet_addresses"] = u.generate_wallet_addresses(parsed_data["sign_id"], public_hash)
-                        if parsed_data.get("guuid", ""):
-                            del parsed_data["guuid"]
-                        return send_json_response(
-                            status_code=0,
-                            response_data=parsed_data
-                        )
+                        return self._profile_response(public_hash, parsed_data, exclude, fields, if_none_match)
                 return send_json_response("NOK", f"Telegram username {lookup} not found", -1)
 
+            if by_guuid:
+                public_hash, record = self._find_by(("guuid",), lookup)
+                if public_hash:
+                    return self._profile_response(public_hash, record, exclude, fields, if_none_match)
+                return send_json_response("NOK", f"GUUID {lookup} not found", -1)
+
+            if by_wallet:
+                public_hash, record = self._find_by(("wallets", "external_wallets"), lookup)
+                if public_hash:
+                    return self._profile_response(public_hash, record, exclude, fields, if_none_match)
+                if not u.validate_address(lookup):
+                    return send_json_response("NOK", f"No wallet address found for {lookup}", -1)
+
             if by_order_hash:
-                for public_hash, parsed_data in all_data.items():
-                    delegations = parsed_data.get("delegations", [])
+                all_data = self._get_all_gdb_data()
+                for public_hash, delegations in self._iter_collection("delegations", all_data):
                     for delegation in delegations:
                         if delegation.get("order_hash", "") == lookup:
-                            parsed_data["wallet_addresses"] = u.generate_wallet_addresses(parsed_data["sign_id"], public_hash)
-                            parsed_data.pop("guuid", None)
-                            return send_json_response(status_code=0, response_data=parsed_data)
+                            return self._profile_response(public_hash, all_data[public_hash], exclude, fields, if_none_match)
                 return send_json_response("NOK", f"Order hash {lookup} not found", -1)
 
             if not u.validate_address(lookup):
+                if self.index.ready.is_set():
+                    if as_list:
+                        with self.index.lock:
+                            all_results = [name for name in self.index.names if lookup.lower() in name]
+                        if all_results:
+                            return send_json_response(status_code=0, response_data=all_results)
+                        return send_json_response("NOK", f"Name '{lookup}' not found", -1)
+                    found = self._indexed_record(self.index.names, lookup.lower(), lambda _, record: self._has_name(record, lookup))
+                    if found is not None and not found[0]:
+                        found = self._indexed_record(self.index.guuids, lookup.lower(), lambda _, record: str(record.get("guuid", "")).lower() == lookup.lower())
+                    if found is not None:
+                        if found[0]:
+                            return self._profile_response(*found, exclude, fields, if_none_match)
+                        return send_json_response("NOK", f"Name or GUUID '{lookup}' not found", -1)
+
                 all_results = []
-                for public_hash, parsed_data in all_data.items():
+                guuid_match = None
+                for public_hash, parsed_data in self._get_all_gdb_data().items():
+                    if not as_list and str(parsed_data.get("guuid", "")).lower() == lookup.lower():
+                        guuid_match = (public_hash, parsed_data)
                     if "registered_names" in parsed_data:
                         if as_list:
                             matched_names = [
@@ -266,28 +783,24 @@ class GlobalDBOps:
                             if as_list:
                                 all_results.extend(matched_names)
                             else:
-                                if parsed_data.get("guuid", ""):
-                                    del parsed_data["guuid"]
-                                parsed_data["wallet_addresses"] = u.generate_wallet_addresses(parsed_data["sign_id"], public_hash)
-                                return send_json_response(status_code=0, response_data=parsed_data)
+                                return self._profile_response(public_hash, parsed_data, exclude, fields, if_none_match)
 
-                if as_list and all_results:
-                    return send_json_response(status_code=0, response_data=all_results)
+                if as_list:
+                    if all_results:
+                        return send_json_response(status_code=0, response_data=all_results)
+                    return send_json_response("NOK", f"Name '{lookup}' not found", -1)
 
+                if guuid_match:
+                    return self._profile_response(*guuid_match, exclude, fields, if_none_match)
                 return send_json_response("NOK", f"Name or GUUID '{lookup}' not found", -1)
 
             public_hash, _ = self._get_public_hash({"wallet": lookup})
             if not public_hash:
                 return send_json_response("NOK", "Failed to parse wallet address!", -1)
 
-            info = self.gdb_group.get(public_hash)
-            if info:
-                info = json.loads(info.decode("utf-8"))
-                if "registered_names" in info:
-                    info["wallet_addresses"] = u.generate_wallet_addresses(info["sign_id"], public_hash)
-                    if info.get("guuid", ""):
-                        del info["guuid"]
-                    return send_json_response(status_code=0, response_data=info)
+            info = self._get_record(public_hash)
+            if info and "registered_names" in info:
+                return self._profile_response(public_hash, info, exclude, fields, if_none_match)
 
             return send_json_response("NOK", f"No wallet address found for {lookup}", -1)
 
@@ -296,6 +809,184 @@ class GlobalDBOps:
             self.log.error(traceback.format_exc())
             return send_json_response("NOK", f"Error fetching data for {lookup}", -1)
 
+    def get_status(self):
+        return send_json_response(status_code=0, response_data={
+            "ready": self.index.ready.is_set(),
+            "stage": self.stage,
+            "index_source": self.index_source,
+            "profiles": len(self.index),
+            "epoch": self.changes.epoch,
+            "seq": self.changes.seq,
+            "uptime": round(time() - self.started_at, 3),
+            "warm_up_time": round(self.ready_at - self.started_at, 3) if self.ready_at else None
+        })
+
+    def get_stats(self):
+        return send_json_response(status_code=0, response_data=dict(self.stats.get(), ready=self.index.ready.is_set()))
+
+    def recompute_stats(self):
+        """
+        Rebuilds the stats counters from the index, which carries the embedded
+        delegations, and the delegation groups of the stored profiles.
+        """
+        first_run = self.stats.recomputed_at is None
+        all_data = self._get_all_gdb_data()
+        delegations = {public_hash: items for public_hash, items in self.collections.iter_profiles("delegations") if public_hash in all_data}
+        with self.index.lock:
+            drift = self.stats.recompute(dict(self.index.entries), delegations)
+        if drift and not first_run:
+            self.log.notice(f"Stats counters drifted from {drift[0]} to {drift[1]}")
+
+    def _replay_journal(self, checkpoint):
+        self.index.load(checkpoint["index"])
+        for entry in checkpoint["tail"]:
+            self._try_reindex(entry["public_hash"])
+        reconciled = self.reconcile_index()
+        self.log.notice(f"Replayed {len(checkpoint['tail'])} journal entries, {reconciled} records reconciled")
+
+    def _rebuild_index(self):
+        self.index.clear()
+        for key, value in self.gdb_group.items():
+            try:
+                self.index.update(key, decode_record(value), RegistryIndex.digest(value))
+            except Exception as e:
+                self.log.error(f"Failed to index {key}, skipping it: {e}")
+                self.log.error(traceback.format_exc())
+
+    def warm_up_index(self):
+        try:
+            self.stage = "loading"
+            self._load_change_log()
+            self.stage = "indexing"
+            if self.checkpoint and not self.index.accepts(self.checkpoint["index"]):
+                self.log.notice("Index checkpoint has another layout, rebuilding the index")
+                self.checkpoint = None
+            if self.checkpoint:
+                self._replay_journal(self.checkpoint)
+                self.index_source = "checkpoint"
+            else:
+                self._rebuild_index()
+                self.index_source = "full_scan"
+            self.checkpoint = None
+            with self.index.lock:
+                for public_hash in self.index.take_dirty():
+                    self._try_reindex(public_hash)
+                self.index.ready.set()
+            self.stage = "ready"
+            self.ready_at = time()
+            self.log.notice(f"Index ready from {self.index_source} in {self.ready_at - self.started_at:.2f}s, {len(self.index)} profiles")
+            if self.index_source == "full_scan":
+                self.write_index_checkpoint()
+            self.recompute_stats()
+            self.migrate_encoding()
+        except Exception as e:
+            if not self.index.ready.is_set():
+                self.stage = "failed"
+            self.log.error(f"Failed to warm up index: {e}")
+            self.log.error(traceback.format_exc())
+
+    def _convert_value(self, group, key, value, lock):
+        """Re-encodes a value unless it was changed since it was read."""
+        with lock:
+            if group.get(key) != value:
+                return False
+            group.set(key, encode_record(decode_record(value), self.encoding))
+            return True
+
+    def migrate_encoding(self):
+        """
+        Converts JSON records to msgpack when msgpack is the configured encoding.
+        Only upgrades are done: a node configured for JSON leaves msgpack values
+        alone, so nodes with different settings do not convert each other's
+        records back and forth. Runs in small batches with pauses, so it can be
+        left running in the background.
+        """
+        if self.encoding != ENCODING_MSGPACK:
+            return 0
+        converted = 0
+        groups = [(self.gdb_group, self.record_lock)]
+        groups.extend((group, self.collections.lock) for group in self.collections.groups.values())
+        for group, lock in groups:
+            for key, value in group.items():
+                if record_encoding(value) != ENCODING_JSON:
+                    continue
+                try:
+                    if self._convert_value(group, key, value, lock):
+                        converted += 1
+                        if group is self.gdb_group:
+                            self._reindex(key)
+                except ValueError as e:
+                    self.log.error(f"Failed to convert {key}: {e}")
+                if converted and converted % Config.ENCODING_MIGRATION_BATCH == 0:
+                    sleep(Config.ENCODING_MIGRATION_PAUSE)
+        if converted:
+            self.write_index_checkpoint()
+            self.log.notice(f"Converted {converted} records to {self.encoding} encoding")
+        return converted
+
+    def write_index_checkpoint(self):
+        with self.mutation_lock:
+            epoch, seq, state, changes = self.changes.epoch, self.changes.seq, self.index.snapshot(), self.changes.snapshot()
+        self.journal.write_checkpoint(epoch, seq, state, changes)
+        return seq
+
+    def reconcile_index(self):
+        """
+        Picks up records written by other nodes, which never pass through the
+        journal, by comparing the digest of every stored value with the index.
+        """
+        seen = set()
+        changed = []
+        for key, value in self.gdb_group.items():
+            seen.add(key)
+            if self.index.digests.get(key) != RegistryIndex.digest(value):
+                changed.append(key)
+        changed.extend(set(self.index.digests) - seen)
+        for public_hash in changed:
+            try:
+                self._record_change(public_hash, "sync")
+            except Exception as e:
+                self.log.error(f"Failed to index {public_hash}, skipping it: {e}")
+                self.log.error(traceback.format_exc())
+        return len(changed)
+
+    def sync_index(self):
+        """Reconciles the index, one pass at a time."""
+        with self.sync_lock:
+            started = time()
+            reconciled = self.reconcile_index()
+            self.synced_at = started
+            return reconciled
+
+    def sync_index_loop(self):
+        while True:
+            sleep(Config.INDEX_SYNC_INTERVAL)
+            try:
+                if self.index.ready.is_set():
+                    reconciled = self.sync_index()
+                    if reconciled:
+                        self.log.notice(f"Index sync picked up {reconciled} changed records")
+            except Exception as e:
+                self.log.error(f"Failed to sync index: {e}")
+                self.log.error(traceback.format_exc())
+
+    def checkpoint_index(self):
+        last_seq = None
+        last_reconcile = time()
+        while True:
+            sleep(Config.CHECKPOINT_INTERVAL)
+            try:
+                if not self.index.ready.is_set():
+                    continue
+                if time() - last_reconcile >= Config.RECONCILE_INTERVAL:
+                    self.recompute_stats()
+                    last_reconcile = time()
+                if self.changes.seq != last_seq:
+                    last_seq = self.write_index_checkpoint()
+            except Exception as e:
+                self.log.error(f"Failed to write index checkpoint: {e}")
+                self.log.error(traceback.format_exc())
+
     def remove_expired_gdb_entries(self):
         while True:
             try:
@@ -321,42 +1012,76 @@ class GlobalDBOps:
                                 self.log.notice(f"Removed expired registered name: {expired_key}")
 
                             if expired_keys:
-                                    self.gdb_group.set(key, json.dumps(value).encode("utf-8"))
+                                    self._save_record(key, value)
+                                    self._record_change(key, "expire")
                                     self.log.notice(f"Updated entry {key} to remove expired registered names.")
                 sleep(1)
             except Exception as e:
                 self.log.error(f"Failed to remove expired entries: {e}")
                 self.log.error(traceback.format_exc())
 
+    def _write_snapshot(self, path):
+        with open(path, "wb") as f:
+            export_worker.write_snapshot(
+                f,
+                self.gdb_group.items(),
+                [(name, group.items()) for name, group in self.collections.groups.items()]
+            )
+
+    def export_data(self, output, last_digest=None, last_file=None):
+        """
+        Writes all profiles with their collections to output, gzip compressed when
+        it ends in .gz. Only the raw values are read here; decoding, serialization
+        and compression run in a worker process, or in this thread when the worker
+        is disabled or fails to run. Returns the export_worker result.
+        """
+        settings = Config.load_config().get("EXPORT_WORKER", {})
+        snapshot = os.path.join(os.path.dirname(output), f".snapshot_{os.getpid()}_{threading.get_ident()}")
+        try:
+            self._write_snapshot(snapshot)
+            if settings.get("enabled", True):
+                command = [settings.get("python", "python3"), os.path.join(u.get_current_script_directory(), "export_worker.py"), snapshot, output]
+                if last_digest:
+                    command += ["--last-digest", last_digest]
+                if last_file:
+                    command += ["--last-file", last_file]
+                try:
+                    result = subprocess.run(command, capture_output=True, text=True, timeout=settings.get("timeout", 600))
+                    if result.returncode == 0:
+                        return json.loads(result.stdout.strip().splitlines()[-1])
+                    self.log.error(f"Export worker failed: {result.stderr.strip()[-500:]}")
+                except (OSError, subprocess.TimeoutExpired, ValueError, IndexError) as e:
+                    self.log.error(f"Failed to run export worker: {e}")
+                self.log.notice("Exporting in the plugin thread instead")
+            return export_worker.export(snapshot, output, last_digest, last_file)
+        finally:
+            if os.path.exists(snapshot):
+                os.remove(snapshot)
+
     def backup_dna_data(self):
         try:
             curr_path = os.path.dirname(os.path.abspath(__file__))
             backup_dir = os.path.join(curr_path, "backups")
             os.makedirs(backup_dir, exist_ok=True)
-            last_backup = None
             backup_files = sorted(
                 [f for f in os.listdir(backup_dir) if f.startswith("backup_")],
                 key=lambda x: os.path.getmtime(os.path.join(backup_dir, x)),
             )
-
-            if backup_files:
-                last_backup_file = os.path.join(backup_dir, backup_files[-1])
-                with open(last_backup_file, "r") as f:
-                    last_backup = f.read()
+            backup_files = [os.path.join(backup_dir, f) for f in backup_files]
+            last_digest = None
 
             while True:
                 curr_time = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
-                backup_file = os.path.join(backup_dir, f"backup_{curr_time}.json")
-                all_data = self._get_all_gdb_data()
-                if all_data:
-                    new_backup = json.dumps(all_data, indent=2)
-                    if new_backup != last_backup:
-                        self.log.notice("Data changed, creating backup")
-                        with open(backup_file, "w") as f:
-                            f.write(new_backup)
-                        last_backup = new_backup
-                        self.log.notice("Backup created!")
-                    backup_files.append(backup_file)
+                backup_file = os.path.join(backup_dir, f"backup_{curr_time}.json.gz")
+                last_file = backup_files[-1] if backup_files and last_digest is None else None
+                result = self.export_data(backup_file, last_digest, last_file)
+                if result["profiles"]:
+                    last_digest = result["digest"]
+                    if result["written"]:
+                        backup_files.append(backup_file)
+                        self.log.notice(f"Data changed, backup created: {backup_file}")
+                    if result["errors"]:
+                        self.log.error(f"Skipped undecodable records in backup: {result['errors']}")
                     if len(backup_files) > 100:
                         oldest = backup_files.pop(0)
                         os.remove(oldest)
@@ -367,11 +1092,98 @@ class GlobalDBOps:
             self.log.error(f"Failed to run backup: {e}")
             self.log.error(traceback.format_exc())
 
-    def restore_dna_data(self, data):
+    def _restore_profile(self, public_hash, profile, live_profile, dry_run):
+        profile = dict(profile)
+        for name in self.collections.names:
+            profile[name] = profile.get(name) or []
+        if live_profile == profile:
+            return "unchanged"
+        status = "added" if live_profile is None else "updated"
+        if dry_run:
+            return status
+        live_profile = live_profile or {}
+        written = False
+        core = {key: value for key, value in profile.items() if key not in self.collections.names}
+        if core != self._get_record(public_hash):
+            self._save_record(public_hash, core)
+            written = True
+        for name in self.collections.names:
+            if profile[name] != live_profile.get(name, []):
+                self.collections.replace(public_hash, name, profile[name])
+                written = True
+        if written:
+            self._record_change(public_hash, "restore")
+        return status
+
+    def _delete_profile(self, public_hash, dry_run):
+        if not dry_run:
+            self.gdb_group.delete(public_hash)
+            for name in self.collections.names:
+                self.collections.clear(public_hash, name)
+            self._record_change(public_hash, "delete")
+        return "deleted"
+
+    def _load_restore_progress(self, progress_file, fingerprint):
+        try:
+            with open(progress_file, "r") as f:
+                progress = json.load(f)
+            if progress.get("fingerprint") == fingerprint and progress.get("last"):
+                return tuple(progress["last"])
+            self.log.notice("Restore progress belongs to another backup, starting over")
+        except FileNotFoundError:
+            pass
+        except (OSError, json.JSONDecodeError) as e:
+            self.log.error(f"Failed to read restore progress: {e}")
+        return None
+
+    def _save_restore_progress(self, progress_file, fingerprint, last):
+        tmp_file = progress_file + ".tmp"
+        with open(tmp_file, "w") as f:
+            json.dump({"fingerprint": fingerprint, "last": list(last)}, f)
+        os.replace(tmp_file, progress_file)
+
+    def restore_dna_data(self, data, source=None, dry_run=False, delete_extra=False, resume=False, progress_file=None):
+        """
+        Restores profiles from a backup, writing only the records that differ from
+        the live group and, with delete_extra, deleting records that are not in the
+        backup. Restores run in key order before the deletes, and the last processed
+        step is checkpointed to progress_file, so an interrupted restore resumes
+        after it even though the deletes are recomputed from the live group. With
+        dry_run nothing is written. Returns (summary, diff).
+        """
+        summary = {"added": 0, "updated": 0, "unchanged": 0, "deleted": 0, "resumed_from": 0}
+        diff = {"added": [], "updated": [], "deleted": []}
         try:
-            for key, value in data.items():
-                self.gdb_group.set(key, json.dumps(value).encode("utf-8"))
-            self.log.notice("Data restoration complete.")
+            if not dry_run:
+                self.migrate_storage()
+            live = self._get_all_profiles()
+            work = [(0, key) for key in sorted(data)]
+            if delete_extra:
+                work.extend((1, key) for key in sorted(set(live) - set(data)))
+            fingerprint = {"source": source, "keys": len(data), "delete_extra": delete_extra}
+            last = self._load_restore_progress(progress_file, fingerprint) if resume and progress_file else None
+            if last:
+                done = len(work)
+                work = [step for step in work if step > last]
+                summary["resumed_from"] = done - len(work)
+
+            for position, step in enumerate(work):
+                op, key = step
+                if op == 0:
+                    status = self._restore_profile(key, data[key], live.get(key), dry_run)
+                else:
+                    status = self._delete_profile(key, dry_run)
+                summary[status] += 1
+                if status != "unchanged":
+                    diff[status].append(key)
+                if progress_file and not dry_run and (position + 1) % Config.RESTORE_CHECKPOINT_EVERY == 0:
+                    self._save_restore_progress(progress_file, fingerprint, step)
+
+            if progress_file and not dry_run and os.path.exists(progress_file):
+                os.remove(progress_file)
+            self.log.notice(f"Data restoration {'dry run ' if dry_run else ''}complete: {summary}")
+            return summary, diff
         except Exception as e:
             self.log.error(f"Failed to restore data: {e}")
-            self.log.error(traceback.format_exc())
\ No newline at end of file
+            self.log.error(traceback.format_exc())
+            raise
\ No newline at end of file
@@ -1,21 +1,43 @@
 from response_helpers import send_json_response
 from pycfhelpers.node.logging import CFLog
 from utils import Utils as u
+from config import Config as c
 from urllib.parse import parse_qs
+from time import time, perf_counter
 import json, traceback
 from gdb_ops import GlobalDBOps
+from scheduler import RequestScheduler
+from rate_limiter import TokenBucketLimiter
+from request_capture import RequestCapture
 
 log = CFLog()
 gdb_ops = GlobalDBOps()
+scheduler = RequestScheduler()
+rate_limiter = TokenBucketLimiter.from_config(c.load_config().get("RATE_LIMIT"))
+capture = RequestCapture.from_config(c.load_config().get("CAPTURE"), u.get_current_script_directory())
+
+HEAVY_QUERIES = ("all_delegations", "by_order", "changes_since")
+INDEXED_QUERIES = ("lookup", "lookup2", "by_telegram", "by_guuid", "by_wallet", "messages")
 
 def request_handler(request):
+    started, start = time(), perf_counter()
+    response = process_request(request)
+    capture.record(request, response, started, perf_counter() - start)
+    return response
+
+def process_request(request):
     headers = request.headers
     body = request.body
     query = request.query
     client_ip = request.client_address
 
+    wait = rate_limiter.check(rate_limiter.client_key(client_ip, headers), get_rate_limit_action(request.method, query))
+    if wait:
+        return send_json_response("NOK", "Too many requests!", -1, http_code=429, headers={"Retry-After": str(wait)})
+
     log.notice(f"Received request from {client_ip} with {body} and headers {headers}")
 
+    payload = None
     if body:
         try:
             payload = body.decode("utf-8")
@@ -23,13 +45,32 @@ def request_handler(request):
             return send_json_response("NOK", "Invalid JSON data!", -1)
 
     if request.method == "POST":
-        return handle_post_request(payload)
+        if not payload:
+            return send_json_response("NOK", "Missing request body!", -1)
+        return scheduler.run("write", handle_post_request, payload)
 
     if request.method == "GET":
-        return handle_get_request(query)
+        return scheduler.run(classify_get_request(query), handle_get_request, query, headers)
 
     return send_json_response("NOK", "Invalid request method!", -1)
 
+def get_rate_limit_action(method, query):
+    if method == "POST":
+        return "write"
+    keys = {part.split("=", 1)[0] for part in (query or "").split("&")}
+    for action in rate_limiter.actions:
+        if action in keys:
+            return action
+    return None
+
+def classify_get_request(query):
+    query_params = parse_qs(query)
+    if any(key in query_params for key in HEAVY_QUERIES):
+        return "heavy"
+    if not gdb_ops.index.ready.is_set() and any(key in query_params for key in INDEXED_QUERIES):
+        return "heavy"
+    return "cheap"
+
 def handle_post_request(payload):
     try:
         validation_error = u.validate_json_data(payload)
@@ -49,6 +90,10 @@ def handle_post_request(payload):
             return gdb_ops.write_gdb_data(data)
         elif action == "update":
             return gdb_ops.update_gdb_data_old_name(data)
+        elif action == "message":
+            return gdb_ops.append_messages(data)
+        elif action == "bulk":
+            return gdb_ops.write_bulk_data(data)
         else:
             return send_json_response("NOK", "Invalid action", -1)
     except Exception as e:
@@ -56,28 +101,74 @@ def handle_post_request(payload):
         log.error(traceback.format_exc())
         return send_json_response("NOK", f"Error while processing action", -1)
 
-def handle_get_request(query):
+def get_excluded_fields(query_params):
+    if "exclude" in query_params:
+        return tuple(field.strip() for field in query_params["exclude"].split(",") if field.strip() not in ("", "none"))
+    return tuple(c.load_config().get("LOOKUP_EXCLUDE", []))
+
+def get_requested_fields(query_params):
+    if "fields" not in query_params:
+        return None
+    return tuple(field.strip() for field in query_params["fields"].split(",") if field.strip())
+
+def handle_get_request(query, headers=None):
     try:
         query_params_raw = parse_qs(query)
         query_params = {k: v[0] for k, v in query_params_raw.items()}
         log.notice(f"Processing GET request with query params: {query_params}")
 
+        if "status" in query_params:
+            return gdb_ops.get_status()
+
+        if "stats" in query_params:
+            return gdb_ops.get_stats()
+
+        if "server_stats" in query_params:
+            return send_json_response(status_code=0, response_data=dict(scheduler.get_stats(), rate_limit=rate_limiter.get_stats()))
+
         if "tx_validate" in query_params:
             tx_hash = query_params["tx_validate"]
             network = query_params.get("network", None)
             return u.is_tx_accepted(tx_hash, network)
 
+        exclude = get_excluded_fields(query_params)
+        fields = get_requested_fields(query_params)
+        if_none_match = u.get_header(headers, "If-None-Match")
+
         if "lookup" in query_params:
-            return gdb_ops.gdb_lookup(query_params["lookup"])
+            return gdb_ops.gdb_lookup(query_params["lookup"], exclude=exclude, fields=fields, if_none_match=if_none_match)
 
         if "lookup2" in query_params:
             return gdb_ops.gdb_lookup(query_params["lookup2"], as_list=True)
 
         if "by_telegram" in query_params:
-            return gdb_ops.gdb_lookup(query_params["by_telegram"], by_telegram_name=True)
+            return gdb_ops.gdb_lookup(query_params["by_telegram"], by_telegram_name=True, exclude=exclude, fields=fields, if_none_match=if_none_match)
+
+        if "by_guuid" in query_params:
+            return gdb_ops.gdb_lookup(query_params["by_guuid"], by_guuid=True, exclude=exclude, fields=fields, if_none_match=if_none_match)
+
+        if "by_wallet" in query_params:
+            return gdb_ops.gdb_lookup(query_params["by_wallet"], by_wallet=True, exclude=exclude, fields=fields, if_none_match=if_none_match)
 
         if "by_order" in query_params:
-            return gdb_ops.gdb_lookup(query_params["by_order"], by_order_hash=True)
+            return gdb_ops.gdb_lookup(query_params["by_order"], by_order_hash=True, exclude=exclude, fields=fields, if_none_match=if_none_match)
+
+        if "messages" in query_params:
+            return gdb_ops.get_messages(
+                query_params["messages"],
+                cursor=query_params.get("cursor"),
+                since=query_params.get("since"),
+                limit=query_params.get("limit")
+            )
+
+        if "changes_since" in query_params:
+            return gdb_ops.get_changes(
+                query_params["changes_since"],
+                limit=query_params.get("limit"),
+                epoch=query_params.get("epoch"),
+                exclude=exclude,
+                fields=fields
+            )
 
         if "all_delegations" in query_params:
             return gdb_ops.gdb_lookup("all_delegations")
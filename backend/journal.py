@@ -0,0 +1,100 @@
+from pycfhelpers.node.logging import CFLog
+from datetime import datetime, timezone
+import json, os, threading, hashlib
+
+class MutationJournal:
+    """
+    Local append-only journal of the mutations made by this plugin, plus
+    periodic checkpoints of the registry index. On restart the last checkpoint
+    is loaded and only the journal entries written after it are replayed.
+
+    journal.log holds one JSON line per mutation (seq, op, public_hash, hash).
+    checkpoint.json holds the change log epoch, the last seq it covers, the
+    retained change log entries, the index snapshot and a checksum of both.
+    """
+
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        self.journal_file = os.path.join(directory, "journal.log")
+        self.checkpoint_file = os.path.join(directory, "checkpoint.json")
+        self.lock = threading.Lock()
+        self.log = CFLog()
+
+    @staticmethod
+    def _checksum(index_state, changes):
+        return hashlib.sha256(json.dumps([index_state, changes], sort_keys=True).encode("utf-8")).hexdigest()
+
+    def append(self, change, record_hash):
+        line = json.dumps(dict(change, hash=record_hash), separators=(",", ":"))
+        with self.lock:
+            with open(self.journal_file, "a") as f:
+                f.write(line + "\n")
+
+    def reset(self):
+        with self.lock:
+            open(self.journal_file, "w").close()
+
+    def _read_entries(self):
+        entries = []
+        if not os.path.exists(self.journal_file):
+            return entries
+        with open(self.journal_file, "r") as f:
+            lines = f.read().splitlines()
+        for number, line in enumerate(lines):
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                if number == len(lines) - 1:
+                    self.log.error("Ignoring truncated last journal entry")
+                    break
+                raise
+        return entries
+
+    def write_checkpoint(self, epoch, seq, index_state, changes):
+        checkpoint = {
+            "epoch": epoch,
+            "seq": seq,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "checksum": self._checksum(index_state, changes),
+            "changes": changes,
+            "index": index_state
+        }
+        tmp_file = self.checkpoint_file + ".tmp"
+        with open(tmp_file, "w") as f:
+            json.dump(checkpoint, f, separators=(",", ":"))
+        os.replace(tmp_file, self.checkpoint_file)
+
+        with self.lock:
+            tail = [entry for entry in self._read_entries() if entry["seq"] > seq]
+            tmp_file = self.journal_file + ".tmp"
+            with open(tmp_file, "w") as f:
+                for entry in tail:
+                    f.write(json.dumps(entry, separators=(",", ":")) + "\n")
+            os.replace(tmp_file, self.journal_file)
+        self.log.notice(f"Wrote index checkpoint at seq {seq}, {len(tail)} journal entries kept")
+
+    def load(self):
+        """
+        Returns the verified checkpoint with the journal tail written after it
+        under "tail", or None when there is no usable checkpoint.
+        """
+        if not os.path.exists(self.checkpoint_file):
+            self.log.notice("No index checkpoint found")
+            return None
+        try:
+            with open(self.checkpoint_file, "r") as f:
+                checkpoint = json.load(f)
+            if checkpoint.get("checksum") != self._checksum(checkpoint["index"], checkpoint["changes"]):
+                self.log.error("Index checkpoint checksum mismatch")
+                return None
+            with self.lock:
+                tail = [entry for entry in self._read_entries() if entry["seq"] > checkpoint["seq"]]
+            for expected, entry in enumerate(tail, start=checkpoint["seq"] + 1):
+                if entry["seq"] != expected:
+                    self.log.error(f"Journal gap: expected seq {expected}, found {entry['seq']}")
+                    return None
+            checkpoint["tail"] = tail
+            return checkpoint
+        except (OSError, KeyError, TypeError, json.JSONDecodeError) as e:
+            self.log.error(f"Failed to load index checkpoint: {e}")
+            return None
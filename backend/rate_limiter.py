@@ -0,0 +1,74 @@
+from collections import OrderedDict
+from time import monotonic
+import threading, math
+
+class TokenBucketLimiter:
+    """
+    Per-client token buckets, with optional stricter buckets per action.
+
+    Client states are kept in a bounded LRU, so a flood of distinct
+    addresses can only evict old buckets and never grow memory.
+    """
+
+    def __init__(self, rate=5, burst=20, max_clients=10000, actions=None, enabled=True, trusted_proxies=()):
+        self.enabled = enabled
+        self.default = (float(rate), float(burst))
+        self.actions = {name: (float(limits["rate"]), float(limits["burst"])) for name, limits in (actions or {}).items()}
+        self.max_clients = max_clients
+        self.trusted_proxies = set(trusted_proxies)
+        self.buckets = OrderedDict()
+        self.lock = threading.Lock()
+        self.rejected = 0
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(**config) if config else cls(enabled=False)
+
+    def client_key(self, client_address, headers=None):
+        if isinstance(client_address, (tuple, list)):
+            client = str(client_address[0])
+        else:
+            client = str(client_address or "")
+            if client.count(":") == 1:
+                client = client.split(":")[0]
+        if client in self.trusted_proxies and headers:
+            for name, value in dict(headers).items():
+                if name.lower() == "x-forwarded-for" and value:
+                    return value.split(",")[0].strip()
+        return client
+
+    def _refill(self, key, rate, burst, now):
+        tokens, updated = self.buckets.pop(key, (burst, now))
+        return min(burst, tokens + (now - updated) * rate)
+
+    @staticmethod
+    def _wait(tokens, rate):
+        if tokens >= 1:
+            return 0
+        return math.ceil((1 - tokens) / rate) if rate > 0 else 60
+
+    def check(self, client, action=None):
+        """
+        Returns 0 if the request is allowed, otherwise the seconds to wait. A
+        token is only taken when both the client and the action bucket allow it.
+        """
+        if not self.enabled:
+            return 0
+        now = monotonic()
+        limits = [((client, None), self.default)]
+        if action in self.actions:
+            limits.append(((client, action), self.actions[action]))
+        with self.lock:
+            levels = [(key, self._refill(key, rate, burst, now), rate) for key, (rate, burst) in limits]
+            wait = max(self._wait(tokens, rate) for _, tokens, rate in levels)
+            for key, tokens, _ in levels:
+                self.buckets[key] = (tokens if wait else tokens - 1, now)
+            while len(self.buckets) > self.max_clients:
+                self.buckets.popitem(last=False)
+            if wait:
+                self.rejected += 1
+            return wait
+
+    def get_stats(self):
+        with self.lock:
+            return {"enabled": self.enabled, "clients": len(self.buckets), "rejected": self.rejected}
@@ -0,0 +1,39 @@
+"""
+Encoding of the values stored in the DNA groups.
+
+Plain UTF-8 JSON values are written without a prefix, exactly as older plugin
+versions wrote them, and always start with "{" or "[". Compact binary values
+start with a version byte, so readers can tell the formats apart and decode
+both while existing records are being converted.
+"""
+
+import json
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+ENCODING_JSON = "json"
+ENCODING_MSGPACK = "msgpack"
+MSGPACK_V1 = b"\x01"
+
+def available_encodings():
+    return [ENCODING_JSON] + ([ENCODING_MSGPACK] if msgpack else [])
+
+def encode_record(record, encoding=ENCODING_JSON):
+    if encoding == ENCODING_MSGPACK:
+        if msgpack is None:
+            raise ValueError("msgpack encoding requested but msgpack is not installed")
+        return MSGPACK_V1 + msgpack.packb(record, use_bin_type=True)
+    return json.dumps(record, separators=(",", ":")).encode("utf-8")
+
+def decode_record(value):
+    if value[:1] == MSGPACK_V1:
+        if msgpack is None:
+            raise ValueError("Record is msgpack encoded but msgpack is not installed")
+        return msgpack.unpackb(value[1:], raw=False)
+    return json.loads(value.decode("utf-8"))
+
+def record_encoding(value):
+    return ENCODING_MSGPACK if value[:1] == MSGPACK_V1 else ENCODING_JSON
@@ -0,0 +1,164 @@
+from registry_stats import RegistryStats
+from datetime import datetime, timezone
+import threading, hashlib
+
+class RegistryIndex:
+    """
+    In-memory lookup index over the core profile records of the DNA group.
+
+    For every public_hash the index keeps the digest of the stored bytes and a
+    small summary of the indexed fields, so a record can be re-indexed or
+    dropped without touching the others. Updates made while the index is not
+    ready yet are remembered as dirty and re-read once warm-up has finished.
+
+    Wallet addresses derived from the public_hash are computed by the
+    derive_wallets callback. They depend on the configured networks, which
+    are part of the layout, so a checkpoint written with other networks or an
+    older summary format is not loaded.
+
+    Every summary added or dropped is also passed to the optional stats
+    object, which keeps the registry counters in step with the index. The
+    summary carries the totals of a delegations list still embedded in the
+    record for it.
+    """
+
+    FORMAT = 4
+
+    def __init__(self, derive_wallets=None, wallet_networks=(), stats=None):
+        self.lock = threading.RLock()
+        self.ready = threading.Event()
+        self.dirty = set()
+        self.digests = {}
+        self.entries = {}
+        self.names = {}
+        self.telegram = {}
+        self.guuids = {}
+        self.wallets = {}
+        self.external_wallets = {}
+        self.derive_wallets = derive_wallets
+        self.stats = stats
+        self.layout = {"format": self.FORMAT, "networks": sorted(wallet_networks)}
+
+    @staticmethod
+    def digest(value):
+        return hashlib.sha256(value).hexdigest()
+
+    @staticmethod
+    def wallet_key(address):
+        return address.strip().lower()
+
+    @staticmethod
+    def parse_time(value):
+        try:
+            parsed = datetime.fromisoformat(value)
+        except (TypeError, ValueError):
+            return None
+        return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+    @staticmethod
+    def _mapping(value):
+        return value if isinstance(value, dict) else {}
+
+    @staticmethod
+    def _text(value):
+        return value.lower() if isinstance(value, str) else ""
+
+    @staticmethod
+    def summarize(record):
+        """
+        Summary of the indexed fields. Replicated records are not validated by
+        this node, so fields of the wrong type are indexed as empty.
+        """
+        registered_names = RegistryIndex._mapping(record.get("registered_names"))
+        telegram = RegistryIndex._mapping(RegistryIndex._mapping(record.get("socials")).get("telegram"))
+        external_wallets = RegistryIndex._mapping(record.get("dinosaur_wallets")).values()
+        names = [data for data in registered_names.values() if isinstance(data, dict)]
+        expires = [RegistryIndex.parse_time(data.get("expires_on")) for data in names]
+        created = [RegistryIndex.parse_time(data.get("created_at")) for data in names]
+        delegations = record.get("delegations")
+        return {
+            "names": sorted(name.lower() for name in registered_names if isinstance(name, str)),
+            "telegram": RegistryIndex._text(telegram.get("profile")),
+            "guuid": RegistryIndex._text(record.get("guuid")),
+            "external_wallets": sorted({RegistryIndex.wallet_key(address) for address in external_wallets if isinstance(address, str) and address.strip()}),
+            "telegram_verified": telegram.get("verified") is True,
+            "expires": sorted(time.timestamp() for time in expires if time),
+            "registered": sorted(time.date().isoformat() for time in created if time),
+            "delegations": RegistryStats.totals(delegations) if isinstance(delegations, list) else None
+        }
+
+    def describe(self, public_hash, record):
+        """Returns the summary of a record including its derived wallet addresses."""
+        entry = self.summarize(record)
+        wallets = self.derive_wallets(public_hash, record) if self.derive_wallets else ()
+        entry["wallets"] = sorted({self.wallet_key(address) for address in wallets})
+        return entry
+
+    def mapping(self, field):
+        return {"names": self.names, "telegram": self.telegram, "guuid": self.guuids, "wallets": self.wallets, "external_wallets": self.external_wallets}[field]
+
+    def _keys(self, entry):
+        keys = [(self.names, name) for name in entry["names"]]
+        keys.extend((self.wallets, address) for address in entry["wallets"])
+        keys.extend((self.external_wallets, address) for address in entry["external_wallets"])
+        keys.extend((mapping, entry[field]) for mapping, field in ((self.telegram, "telegram"), (self.guuids, "guuid")) if entry[field])
+        return keys
+
+    def _add_entry(self, public_hash, entry):
+        self.entries[public_hash] = entry
+        for mapping, key in self._keys(entry):
+            mapping[key] = public_hash
+        if self.stats:
+            self.stats.add(public_hash, entry)
+
+    def _drop_entry(self, public_hash):
+        entry = self.entries.pop(public_hash, None)
+        self.digests.pop(public_hash, None)
+        if not entry:
+            return
+        if self.stats:
+            self.stats.drop(public_hash, entry)
+        for mapping, key in self._keys(entry):
+            if mapping.get(key) == public_hash:
+                del mapping[key]
+
+    def update(self, public_hash, record, digest):
+        with self.lock:
+            if not self.ready.is_set():
+                self.dirty.add(public_hash)
+            self._drop_entry(public_hash)
+            if record is None:
+                return
+            self._add_entry(public_hash, self.describe(public_hash, record))
+            self.digests[public_hash] = digest
+
+    def remove(self, public_hash):
+        self.update(public_hash, None, None)
+
+    def take_dirty(self):
+        with self.lock:
+            dirty, self.dirty = self.dirty, set()
+            return dirty
+
+    def snapshot(self):
+        with self.lock:
+            return {"layout": self.layout, "digests": dict(self.digests), "entries": dict(self.entries)}
+
+    def accepts(self, state):
+        return state.get("layout") == self.layout
+
+    def load(self, state):
+        with self.lock:
+            self.digests, self.entries, self.names, self.telegram = {}, {}, {}, {}
+            self.guuids, self.wallets, self.external_wallets = {}, {}, {}
+            if self.stats:
+                self.stats.clear_profiles()
+            for public_hash, entry in state["entries"].items():
+                self._add_entry(public_hash, entry)
+            self.digests.update(state["digests"])
+
+    def clear(self):
+        self.load({"digests": {}, "entries": {}})
+
+    def __len__(self):
+        return len(self.entries)
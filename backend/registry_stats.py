@@ -0,0 +1,163 @@
+from collections import Counter
+from bisect import insort, bisect_left, bisect_right
+from datetime import datetime, timezone
+from config import Config
+import threading
+
+class RegistryStats:
+    """
+    Registry wide counters for the stats endpoint.
+
+    The registry index feeds every profile summary it adds or drops into
+    add/drop, and GDBCollections reports delegation appends and clears, so
+    reading the stats never touches the GDB. Name expiries are kept in a
+    sorted list, which makes the active/expiring split two bisects.
+
+    Delegations still embedded in not yet migrated records arrive with the
+    summaries and are counted apart from the collection groups, so moving
+    them into the collection group does not count them twice.
+
+    Changes that bypass both, like collection chunks replicated from other
+    nodes, are corrected by the periodic recompute.
+    """
+
+    def __init__(self, expiring_soon_days=Config.STATS_EXPIRING_SOON_DAYS):
+        self.expiring_soon = expiring_soon_days * 86400
+        self.lock = threading.Lock()
+        self.recomputed_at = None
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self._reset_profiles()
+            self.delegations = {}
+            self.delegation_count = 0
+            self.delegation_amount = 0.0
+
+    def _reset_profiles(self):
+        self.profiles = 0
+        self.names = 0
+        self.telegram_verified = 0
+        self.expiries = []
+        self.registrations = Counter()
+        self.embedded = {}
+        self.embedded_count = 0
+        self.embedded_amount = 0.0
+
+    def clear_profiles(self):
+        with self.lock:
+            self._reset_profiles()
+
+    @staticmethod
+    def _amount(item):
+        try:
+            return float(item.get("amount", 0) or 0)
+        except (TypeError, ValueError, AttributeError):
+            return 0.0
+
+    @classmethod
+    def totals(cls, items):
+        """Returns [count, amount] of a delegations list."""
+        return [len(items), sum(cls._amount(item) for item in items)]
+
+    def _set_embedded(self, public_hash, totals):
+        old_count, old_amount = self.embedded.pop(public_hash, (0, 0.0))
+        count, amount = totals or (0, 0.0)
+        self.embedded_count += count - old_count
+        self.embedded_amount += amount - old_amount
+        if totals is not None:
+            self.embedded[public_hash] = (count, amount)
+
+    def _apply(self, public_hash, entry, sign):
+        self.profiles += sign
+        self.names += sign * len(entry["names"])
+        if entry["telegram_verified"]:
+            self.telegram_verified += sign
+        for expires in entry["expires"]:
+            if sign > 0:
+                insort(self.expiries, expires)
+            else:
+                position = bisect_left(self.expiries, expires)
+                if position < len(self.expiries) and self.expiries[position] == expires:
+                    del self.expiries[position]
+        for day in entry["registered"]:
+            self.registrations[day] += sign
+            if self.registrations[day] <= 0:
+                del self.registrations[day]
+        if entry["delegations"] is not None:
+            self._set_embedded(public_hash, entry["delegations"] if sign > 0 else None)
+
+    def add(self, public_hash, entry):
+        with self.lock:
+            self._apply(public_hash, entry, 1)
+
+    def drop(self, public_hash, entry):
+        with self.lock:
+            self._apply(public_hash, entry, -1)
+
+    def _set_delegations(self, public_hash, count, amount):
+        old_count, old_amount = self.delegations.pop(public_hash, (0, 0.0))
+        self.delegation_count += count - old_count
+        self.delegation_amount += amount - old_amount
+        if count:
+            self.delegations[public_hash] = (count, amount)
+
+    def collection_changed(self, public_hash, name, items):
+        """Called after items were appended to a collection, or with None after it was cleared."""
+        if name != "delegations":
+            return
+        with self.lock:
+            count, amount = (0, 0.0) if items is None else self.delegations.get(public_hash, (0, 0.0))
+            if items:
+                count += len(items)
+                amount += sum(self._amount(item) for item in items)
+            self._set_delegations(public_hash, count, amount)
+
+    def _delegation_totals(self):
+        return (self.delegation_count + self.embedded_count, round(self.delegation_amount + self.embedded_amount, 8), len(self.delegations.keys() | self.embedded.keys()))
+
+    def _summary(self):
+        return (self.profiles, self.names, self.telegram_verified, len(self.expiries)) + self._delegation_totals()
+
+    def recompute(self, entries, delegations):
+        """
+        Rebuilds all counters from the index entries by public_hash and the
+        items of the delegation groups per public_hash. Returns the old and
+        new totals when they differed.
+        """
+        with self.lock:
+            before = self._summary()
+            self._reset_profiles()
+            for public_hash, entry in entries.items():
+                self._apply(public_hash, entry, 1)
+            self.delegations = {}
+            self.delegation_count = 0
+            self.delegation_amount = 0.0
+            for public_hash, items in delegations.items():
+                self._set_delegations(public_hash, *self.totals(items))
+            self.recomputed_at = datetime.now(timezone.utc).isoformat()
+            after = self._summary()
+            return (before, after) if before != after else None
+
+    def get(self, now=None):
+        now = datetime.now(timezone.utc).timestamp() if now is None else now
+        with self.lock:
+            delegation_count, delegation_amount, delegation_profiles = self._delegation_totals()
+            expired = bisect_right(self.expiries, now)
+            expiring = bisect_right(self.expiries, now + self.expiring_soon) - expired
+            return {
+                "profiles": self.profiles,
+                "names": self.names,
+                "names_active": len(self.expiries) - expired,
+                "names_expiring_soon": expiring,
+                "names_expired": expired,
+                "expiring_soon_days": self.expiring_soon // 86400,
+                "telegram_verified": self.telegram_verified,
+                "registrations_per_day": dict(sorted(self.registrations.items())),
+                "delegations": {
+                    "count": delegation_count,
+                    "amount": delegation_amount,
+                    "profiles": delegation_profiles
+                },
+                "recomputed_at": self.recomputed_at
+            }
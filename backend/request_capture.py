@@ -0,0 +1,87 @@
+from pycfhelpers.node.logging import CFLog
+from logging.handlers import RotatingFileHandler
+import json, logging, os
+
+log = CFLog()
+
+class RequestCapture:
+    """
+    Opt-in capture of the served requests for tools/replay.py.
+
+    Every request is written as one compact JSON line with its method, query,
+    body size, sanitized body, response code and size, and the time it took.
+    Values of the fields in REDACTED_FIELDS are masked with "*" of the same
+    length, so replayed bodies keep their size but not their content. Bodies
+    larger than max_body are left out. The file is rotated at max_bytes.
+    """
+
+    REDACTED_FIELDS = ("messages", "bio", "profile_picture", "nft_images", "signature", "tx_hash")
+
+    def __init__(self, file=None, enabled=False, max_bytes=10485760, backups=5, max_body=4096):
+        self.enabled = bool(enabled and file)
+        self.max_body = max_body
+        self.logger = logging.getLogger("cpunk.capture")
+        if not self.enabled:
+            return
+        os.makedirs(os.path.dirname(file), exist_ok=True)
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+        if not self.logger.handlers:
+            handler = RotatingFileHandler(file, maxBytes=max_bytes, backupCount=backups)
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self.logger.addHandler(handler)
+        log.notice(f"Capturing requests to {file}")
+
+    @classmethod
+    def from_config(cls, config, base_dir):
+        if not config:
+            return cls()
+        config = dict(config)
+        config["file"] = os.path.join(base_dir, config.get("file", "capture/requests.jsonl"))
+        return cls(**config)
+
+    @classmethod
+    def mask(cls, value):
+        if isinstance(value, str):
+            return "*" * len(value)
+        if isinstance(value, list):
+            return [cls.mask(item) for item in value]
+        if isinstance(value, dict):
+            return {key: cls.mask(item) for key, item in value.items()}
+        return value
+
+    @classmethod
+    def sanitize(cls, value):
+        if isinstance(value, dict):
+            return {key: cls.mask(item) if key in cls.REDACTED_FIELDS else cls.sanitize(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [cls.sanitize(item) for item in value]
+        return value
+
+    def _body(self, body):
+        if not body:
+            return None
+        try:
+            sanitized = self.sanitize(json.loads(body.decode("utf-8")))
+        except (UnicodeDecodeError, ValueError):
+            return None
+        return sanitized if len(json.dumps(sanitized, separators=(",", ":"))) <= self.max_body else None
+
+    def record(self, request, response, started, duration):
+        if not self.enabled:
+            return
+        try:
+            body = request.body or b""
+            entry = {
+                "ts": round(started, 3),
+                "method": request.method,
+                "query": request.query or "",
+                "body_size": len(body),
+                "body": self._body(body),
+                "code": getattr(response, "code", None),
+                "response_size": len(getattr(response, "body", None) or b""),
+                "ms": round(duration * 1000, 3)
+            }
+            self.logger.info(json.dumps(entry, separators=(",", ":")))
+        except Exception as e:
+            log.error(f"Failed to capture request: {e}")
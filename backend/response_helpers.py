@@ -4,7 +4,7 @@ import json
 
 log = CFLog()
 
-def send_json_response(message=None, desc=None, status_code=0, response_data=None):
+def send_json_response(message=None, desc=None, status_code=0, response_data=None, http_code=200, headers=None):
     response_dict = {
         "status_code": status_code
     }
@@ -20,6 +20,13 @@ def send_json_response(message=None, desc=None, status_code=0, response_data=Non
     log.notice(response_body)
     return CFSimpleHTTPResponse(
         body=response_body,
-        code=200,
-        headers={"Content-Type": "application/json"}
+        code=http_code,
+        headers={"Content-Type": "application/json", **(headers or {})}
+    )
+
+def send_not_modified(headers=None):
+    return CFSimpleHTTPResponse(
+        body=b"",
+        code=304,
+        headers=headers or {}
     )
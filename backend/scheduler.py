@@ -0,0 +1,101 @@
+from pycfhelpers.node.logging import CFLog
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from response_helpers import send_json_response
+from config import Config
+import threading, traceback
+
+log = CFLog()
+
+class WorkerPool:
+    """
+    Bounded thread pool that rejects work once its workers and queue are full.
+    Without retry_on_timeout, the work is not safe to repeat, so a timed out
+    request is answered as accepted instead of asking the client to retry.
+    """
+
+    def __init__(self, name, workers, queue, retry_on_timeout=True):
+        self.name = name
+        self.workers = workers
+        self.queue_limit = queue
+        self.retry_on_timeout = retry_on_timeout
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"cpunk-{name}")
+        self.slots = threading.BoundedSemaphore(workers + queue)
+        self.lock = threading.Lock()
+        self.stats = {"submitted": 0, "completed": 0, "rejected": 0, "timed_out": 0, "failed": 0, "pending": 0, "active": 0}
+
+    def _count(self, key, delta=1):
+        with self.lock:
+            self.stats[key] += delta
+
+    def _run(self, func, *args):
+        self._count("active")
+        try:
+            return func(*args)
+        finally:
+            self._count("active", -1)
+
+    def _done(self, future):
+        self.slots.release()
+        self._count("pending", -1)
+        self._count("failed" if future.exception() else "completed")
+
+    def submit(self, func, *args):
+        """Returns a future, or None when the pool is saturated."""
+        if not self.slots.acquire(blocking=False):
+            self._count("rejected")
+            return None
+        self._count("submitted")
+        self._count("pending")
+        future = self.executor.submit(self._run, func, *args)
+        future.add_done_callback(self._done)
+        return future
+
+    def get_stats(self):
+        with self.lock:
+            stats = dict(self.stats)
+        stats["queued"] = stats["pending"] - stats["active"]
+        stats["workers"] = self.workers
+        stats["queue_limit"] = self.queue_limit
+        return stats
+
+class RequestScheduler:
+    """
+    Runs cheap requests inline on the HTTP thread and sends heavy scans and
+    writes to their own bounded pools, so a burst of heavy queries gets a fast
+    "busy" answer instead of starving everything else.
+    """
+
+    def __init__(self, pools=Config.WORKER_POOLS, timeout=Config.REQUEST_TIMEOUT):
+        self.timeout = timeout
+        self.pools = {name: WorkerPool(name, **limits) for name, limits in pools.items()}
+        self.inline = 0
+        self.lock = threading.Lock()
+
+    def run(self, kind, func, *args):
+        pool = self.pools.get(kind)
+        if pool is None:
+            with self.lock:
+                self.inline += 1
+            return func(*args)
+
+        future = pool.submit(func, *args)
+        if future is None:
+            log.error(f"Rejected {kind} request, pool is saturated")
+            return send_json_response("NOK", "Server is busy, try again later!", -1, http_code=503, headers={"Retry-After": "1"})
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            pool._count("timed_out")
+            log.error(f"{kind} request did not finish in {self.timeout}s")
+            if not pool.retry_on_timeout:
+                return send_json_response("PENDING", "Request was accepted and is still running, check the result before sending it again!", 1, http_code=202)
+            return send_json_response("NOK", "Request timed out, try again later!", -1, http_code=503, headers={"Retry-After": "5"})
+        except Exception as e:
+            log.error(f"Error while running {kind} request: {e}")
+            log.error(traceback.format_exc())
+            return send_json_response("NOK", "Failed to process request!", -1)
+
+    def get_stats(self):
+        with self.lock:
+            inline = self.inline
+        return {"inline": inline, "pools": {name: pool.get_stats() for name, pool in self.pools.items()}}
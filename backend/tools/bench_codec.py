@@ -0,0 +1,56 @@
+"""
+Compares the record encodings on synthetic DNA profiles shaped like the
+stored core records: encode and decode time per record and the stored size.
+
+    python3 tools/bench_codec.py [--records 2000] [--rounds 5]
+"""
+
+import argparse, json, os, random, sys, time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from replay import install_fakes, synthetic_profiles, BACKEND_DIR
+
+def stored_records(count):
+    """
+    Core records as GlobalDBOps stores them: the _new_profile shape built by
+    synthetic_profiles, without the collections that live in their own groups.
+    """
+    from config import Config
+    return [{key: value for key, value in profile.items() if key not in Config.COLLECTIONS} for profile in synthetic_profiles(count).values()]
+
+def bench(name, encode, decode, records, rounds):
+    encoded = [encode(record) for record in records]
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for record in records:
+            encode(record)
+    encode_time = (time.perf_counter() - start) / rounds / len(records)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for value in encoded:
+            decode(value)
+    decode_time = (time.perf_counter() - start) / rounds / len(records)
+    size = sum(len(value) for value in encoded) / len(encoded)
+    print(f"{name:<14} encode {encode_time * 1e6:8.1f} us  decode {decode_time * 1e6:8.1f} us  size {size:8.0f} B")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    install_fakes()
+    sys.path.insert(0, BACKEND_DIR)
+    from record_codec import encode_record, decode_record, available_encodings
+
+    random.seed(1)
+    records = stored_records(args.records)
+    bench("json (old)", lambda r: json.dumps(r).encode("utf-8"), lambda v: json.loads(v.decode("utf-8")), records, args.rounds)
+    for encoding in available_encodings():
+        bench(encoding, lambda r: encode_record(r, encoding), decode_record, records, args.rounds)
+    if "msgpack" not in available_encodings():
+        print("msgpack is not installed, skipped")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Measures how much a full backup slows down concurrent lookups, with the
+export serialized in the plugin thread and in the export worker process.
+
+A probe thread sends lookup requests through request_handler at a fixed
+interval while an export runs, against the same in-memory GlobalDB that
+tools/replay.py uses:
+
+    python3 tools/bench_export.py [--profiles 20000] [--messages 20]
+"""
+
+import argparse, json, os, random, sys, tempfile, threading, time, types
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from replay import install_fakes, synthetic_profiles, percentile, BACKEND_DIR
+
+def probe(handlers, names, stop, interval):
+    latencies = []
+    while not stop.is_set():
+        request = types.SimpleNamespace(method="GET", query=f"lookup={random.choice(names)}", body=b"", headers={}, client_address=("127.0.0.1", 0))
+        start = time.perf_counter()
+        handlers.request_handler(request)
+        latencies.append((time.perf_counter() - start) * 1000)
+        time.sleep(interval)
+    return latencies
+
+def measure(handlers, names, interval, work):
+    stop = threading.Event()
+    latencies = []
+    thread = threading.Thread(target=lambda: latencies.extend(probe(handlers, names, stop, interval)))
+    thread.start()
+    start = time.perf_counter()
+    work()
+    duration = time.perf_counter() - start
+    stop.set()
+    thread.join()
+    return duration, sorted(latencies)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", type=int, default=20000)
+    parser.add_argument("--messages", type=int, default=20, help="messages per profile, to make the backup heavier")
+    parser.add_argument("--interval", type=float, default=0.002, help="seconds between probe lookups")
+    parser.add_argument("--python", default=sys.executable, help="interpreter for the export worker")
+    args = parser.parse_args()
+
+    install_fakes()
+    sys.path.insert(0, BACKEND_DIR)
+    from config import Config
+    Config.JOURNAL_DIR = tempfile.mkdtemp(prefix="cpunk-bench-")
+    import handlers
+    handlers.rate_limiter.enabled = False
+    handlers.capture.enabled = False
+    gdb_ops = handlers.gdb_ops
+    gdb_ops.warm_up_index()
+
+    random.seed(1)
+    profiles = synthetic_profiles(args.profiles)
+    for profile in profiles.values():
+        profile["messages"] = [{"text": "x" * 120, "timestamp": f"2025-01-01T00:00:{i % 60:02d}+00:00"} for i in range(args.messages)]
+    gdb_ops.restore_dna_data(profiles, source="bench")
+    names = [name for profile in profiles.values() for name in profile["registered_names"]]
+    print(f"Seeded {len(profiles)} profiles with {args.messages} messages each\n")
+
+    output_dir = tempfile.mkdtemp(prefix="cpunk-export-")
+    settings = {}
+    Config.load_config = classmethod(lambda cls: {"EXPORT_WORKER": settings})
+
+    def export(mode):
+        settings.clear()
+        settings.update({"enabled": mode == "process", "python": args.python})
+        result = gdb_ops.export_data(os.path.join(output_dir, f"export_{mode}.json.gz"))
+        if not result["written"]:
+            raise RuntimeError(f"{mode} export wrote nothing: {json.dumps(result)}")
+
+    print(f"{'mode':<10}{'export s':>10}{'lookups':>10}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for mode, work in (("idle", lambda: time.sleep(2)), ("thread", lambda: export("thread")), ("process", lambda: export("process"))):
+        duration, latencies = measure(handlers, names, args.interval, work)
+        print(f"{mode:<10}{duration:>10.2f}{len(latencies):>10}{percentile(latencies, .5):>10.2f}{percentile(latencies, .99):>10.2f}{latencies[-1]:>10.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+"""
+Replays requests captured with the CAPTURE setting against an in-memory
+GlobalDB and reports the latency per query type.
+
+The node bindings (pycfhelpers) are replaced with small in-process fakes, so
+this runs outside of the node:
+
+    python3 tools/replay.py capture/requests.jsonl.1 capture/requests.jsonl \\
+        --seed backups/backup_20250101_000000.json --speed 4
+
+With --speed 1 requests are sent at their original pace, higher values
+compress the gaps between them and --speed 0 sends them back to back. The
+registry is seeded from a backup file (--seed) or with --profiles synthetic
+profiles. Rate limiting, request capture and the backup loop are disabled.
+
+Requests whose body was left out of the capture (larger than max_body) are
+skipped and counted, and requests that raise are reported with code "error".
+"""
+
+import argparse, base58, hashlib, json, os, random, sys, tempfile, threading, time, types, uuid
+from concurrent.futures import ThreadPoolExecutor
+from collections import defaultdict, Counter
+from datetime import datetime, timezone, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def install_fakes(ledger_latency=0.0, verbose=False):
+    """Registers in-memory stand-ins for the pycfhelpers modules the backend imports."""
+
+    class CFLog:
+        def notice(self, message): pass
+        def info(self, message): pass
+        def debug(self, message): pass
+        def warning(self, message): verbose and print(f"WARNING {message}", file=sys.stderr)
+        def error(self, message): verbose and print(f"ERROR {message}", file=sys.stderr)
+
+    class CFGDBGroup:
+        store = defaultdict(dict)
+        lock = threading.Lock()
+
+        def __init__(self, group):
+            self.data = self.store[group]
+
+        def get(self, key, default=None):
+            return self.data.get(key, default)
+
+        def set(self, key, value):
+            with self.lock:
+                self.data[key] = bytes(value)
+
+        def delete(self, key):
+            with self.lock:
+                self.data.pop(key, None)
+
+        def items(self):
+            with self.lock:
+                return list(self.data.items())
+
+        def keys(self):
+            with self.lock:
+                return list(self.data)
+
+    class CFGUUID:
+        @staticmethod
+        def generate():
+            return str(uuid.uuid4())
+
+    class Ledger:
+        def tx_by_hash(self, tx_hash):
+            if ledger_latency:
+                time.sleep(ledger_latency)
+            return types.SimpleNamespace(accepted=True)
+
+    class CFNet:
+        def __init__(self, name):
+            self.name = name
+
+        def get_ledger(self):
+            return Ledger()
+
+    class CFSimpleHTTPResponse:
+        def __init__(self, body=b"", code=200, headers=None):
+            self.body, self.code, self.headers = body, code, headers or {}
+
+    def parse_cf_v1_address(address):
+        try:
+            raw = base58.b58decode(address)
+        except Exception as e:
+            raise ValueError(f"Invalid address: {e}")
+        if len(raw) != 77 or hashlib.sha3_256(raw[:45]).digest() != raw[45:]:
+            raise ValueError("Invalid address")
+        return raw[0], int.from_bytes(raw[1:9], "little"), int.from_bytes(raw[9:13], "little"), raw[13:45], b"", raw[45:]
+
+    modules = {
+        "pycfhelpers": {},
+        "pycfhelpers.common": {},
+        "pycfhelpers.common.parsers": {"parse_cf_v1_address": parse_cf_v1_address},
+        "pycfhelpers.node": {},
+        "pycfhelpers.node.logging": {"CFLog": CFLog},
+        "pycfhelpers.node.gdb": {"CFGDBGroup": CFGDBGroup},
+        "pycfhelpers.node.crypto": {"CFGUUID": CFGUUID},
+        "pycfhelpers.node.net": {"CFNet": CFNet},
+        "pycfhelpers.node.http": {},
+        "pycfhelpers.node.http.simple": {"CFSimpleHTTPResponse": CFSimpleHTTPResponse, "CFSimpleHTTPServer": object, "CFSimpleHTTPRequestHandler": object},
+    }
+    for name, attributes in modules.items():
+        module = types.ModuleType(name)
+        module.__dict__.update(attributes)
+        sys.modules[name] = module
+
+def synthetic_profiles(count):
+    now = datetime.now(timezone.utc)
+    profiles = {}
+    for i in range(count):
+        public_hash = os.urandom(32).hex()
+        created = now - timedelta(days=random.randint(0, 360))
+        profiles[public_hash] = {
+            "public_hash": public_hash,
+            "guuid": str(uuid.uuid4()),
+            "sign_id": 1,
+            "registered_names": {f"user{i}": {"created_at": created.isoformat(), "expires_on": (created + timedelta(days=365)).isoformat(), "tx_hash": os.urandom(32).hex()}},
+            "socials": {"telegram": {"profile": f"tg_user{i}"}, "x": {"profile": ""}, "facebook": {"profile": ""}, "instagram": {"profile": ""}},
+            "bio": "",
+            "dinosaur_wallets": {"BTC": "", "ETH": "", "SOL": "", "QEVM": ""},
+            "profile_picture": "",
+            "delegations": [{"order_hash": os.urandom(32).hex(), "amount": random.randint(1, 1000), "tax": 10, "delegation_time": created.isoformat()} for _ in range(random.randint(0, 3))]
+        }
+    return profiles
+
+def read_capture(files):
+    entries = []
+    for file in files:
+        with open(file, "r") as f:
+            for line in f:
+                if line.strip():
+                    entries.append(json.loads(line))
+    entries.sort(key=lambda entry: entry["ts"])
+    return entries
+
+def query_type(entry):
+    if entry["method"] == "POST":
+        action = entry["body"].get("action") if isinstance(entry.get("body"), dict) else None
+        return f"POST {action or '?'}"
+    return entry["query"].split("&", 1)[0].split("=", 1)[0] or "(empty)"
+
+def body_dropped(entry):
+    return entry.get("body") is None and bool(entry.get("body_size"))
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+def report(results, elapsed):
+    print(f"\n{len(results)} requests in {elapsed:.2f}s ({len(results) / elapsed:.1f} req/s)\n")
+    print(f"{'query':<18}{'count':>7}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}{'lag p99':>10}  codes")
+    by_type = defaultdict(list)
+    for result in results:
+        by_type[result["type"]].append(result)
+    for name in sorted(by_type, key=lambda name: -len(by_type[name])):
+        rows = by_type[name]
+        latencies = sorted(row["ms"] for row in rows)
+        lags = sorted(row["lag_ms"] for row in rows)
+        codes = ",".join(f"{code}:{count}" for code, count in sorted(Counter(str(row["code"]) for row in rows).items()))
+        print(f"{name:<18}{len(rows):>7}{percentile(latencies, .5):>10.2f}{percentile(latencies, .9):>10.2f}"
+              f"{percentile(latencies, .99):>10.2f}{latencies[-1]:>10.2f}{percentile(lags, .99):>10.2f}  {codes}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="+", help="capture files, rotated files may be given in any order")
+    parser.add_argument("--speed", type=float, default=1.0, help="time compression factor, 0 sends back to back")
+    parser.add_argument("--seed", help="backup file to load into the registry")
+    parser.add_argument("--profiles", type=int, default=1000, help="synthetic profiles when no --seed is given")
+    parser.add_argument("--workers", type=int, default=8, help="concurrent request threads, like the node HTTP server")
+    parser.add_argument("--ledger-latency", type=float, default=0.0, help="seconds a fake ledger lookup takes")
+    parser.add_argument("--verbose", action="store_true", help="print backend errors")
+    args = parser.parse_args()
+
+    install_fakes(args.ledger_latency, args.verbose)
+    sys.path.insert(0, BACKEND_DIR)
+    from config import Config
+    Config.JOURNAL_DIR = tempfile.mkdtemp(prefix="cpunk-replay-")
+    import gdb_ops
+    gdb_ops.GlobalDBOps.backup_dna_data = lambda self: None
+    import handlers
+    handlers.rate_limiter.enabled = False
+    handlers.capture.enabled = False
+    handlers.gdb_ops.start()
+
+    if args.seed:
+        with open(args.seed, "r") as f:
+            data = json.load(f)
+    else:
+        data = synthetic_profiles(args.profiles)
+    summary, _ = handlers.gdb_ops.restore_dna_data(data, source="replay")
+    handlers.gdb_ops.index.ready.wait()
+    print(f"Seeded registry: {summary}")
+
+    entries = read_capture(args.files)
+    if not entries:
+        print("No captured requests found")
+        return
+    skipped = [entry for entry in entries if body_dropped(entry)]
+    entries = [entry for entry in entries if not body_dropped(entry)]
+    if skipped:
+        print(f"Skipping {len(skipped)} requests whose body was not captured: {dict(Counter(query_type(entry) for entry in skipped))}")
+    if not entries:
+        return
+    results = []
+    results_lock = threading.Lock()
+
+    def send(entry, due):
+        body = json.dumps(entry["body"]).encode("utf-8") if entry.get("body") is not None else b""
+        request = types.SimpleNamespace(method=entry["method"], query=entry["query"], body=body, headers={}, client_address=("127.0.0.1", 0))
+        start = time.perf_counter()
+        try:
+            code = handlers.request_handler(request).code
+        except Exception as e:
+            code = "error"
+            if args.verbose:
+                print(f"ERROR {query_type(entry)}: {type(e).__name__}: {e}", file=sys.stderr)
+        finished = time.perf_counter()
+        with results_lock:
+            results.append({"type": query_type(entry), "ms": (finished - start) * 1000, "lag_ms": max(0.0, start - due) * 1000, "code": code})
+
+    first_ts = entries[0]["ts"]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        for entry in entries:
+            due = started + ((entry["ts"] - first_ts) / args.speed if args.speed > 0 else 0)
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(send, entry, due)
+    report(results, time.perf_counter() - started)
+
+if __name__ == "__main__":
+    main()
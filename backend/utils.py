@@ -38,22 +38,46 @@ class Utils:
         if not action:
             return "Action is not provided!"
         if action == "add":
-            name = json_data.get("name")
-            address = json_data.get("wallet")
-            if not name:
-                return "Missing DNA name!"
-            elif not Utils.validate_dna_name(name):
-                return f"Invalid DNA name: {name}. DNA name must be between 3 and 36 characters long and contain only alphanumeric characters, hyphens, dots or underscores."
-            elif name in c.load_config().get("DISALLOWED_NAMES"):
-                return f"Invalid DNA name : {name}. Name is on disallowed list."
-            if not address:
-                return "Missing wallet address!"
-            elif not Utils.validate_address(address):
-                return f"Invalid wallet address: {address}"
-            log.notice("Got valid data!")
-            return False
+            return Utils.validate_add_data(json_data)
         elif action == "update":
             return False
+        elif action == "message":
+            if not json_data.get("name") and not json_data.get("wallet"):
+                return "Missing DNA name or wallet address!"
+            messages = json_data.get("messages")
+            if not messages or not isinstance(messages, list) or not all(isinstance(m, dict) for m in messages):
+                return "Messages must be a non-empty list of objects!"
+            return False
+        elif action == "bulk":
+            records = json_data.get("records")
+            if not records or not isinstance(records, list):
+                return "Records must be a non-empty list!"
+            if len(records) > c.BULK_MAX_RECORDS:
+                return f"Too many records, at most {c.BULK_MAX_RECORDS} are accepted per request!"
+            return False
+
+    @staticmethod
+    def validate_add_data(json_data, disallowed_names=None):
+        name = json_data.get("name")
+        address = json_data.get("wallet")
+        if disallowed_names is None:
+            disallowed_names = c.load_config().get("DISALLOWED_NAMES")
+        if not name:
+            return "Missing DNA name!"
+        elif not isinstance(name, str):
+            return "DNA name must be a string!"
+        elif not Utils.validate_dna_name(name):
+            return f"Invalid DNA name: {name}. DNA name must be between 3 and 36 characters long and contain only alphanumeric characters, hyphens, dots or underscores."
+        elif name in disallowed_names:
+            return f"Invalid DNA name : {name}. Name is on disallowed list."
+        if not address:
+            return "Missing wallet address!"
+        elif not isinstance(address, str):
+            return "Wallet address must be a string!"
+        elif not Utils.validate_address(address):
+            return f"Invalid wallet address: {address}"
+        log.notice("Got valid data!")
+        return False
 
     @staticmethod
     def wallet_addr_to_dict(address):
@@ -119,6 +143,15 @@ class Utils:
             for net in net_ids
         }
 
+    @staticmethod
+    def get_header(headers, name):
+        if not headers:
+            return None
+        for key, value in dict(headers).items():
+            if key.lower() == name.lower():
+                return value
+        return None
+
     @staticmethod
     def get_current_script_directory():
         return os.path.dirname(os.path.abspath(__file__))
\ No newline at end of file